@@ -19,11 +19,32 @@ class GameAdmin(admin.ModelAdmin):
 
 @admin.register(Purchase)
 class PurchaseAdmin(admin.ModelAdmin):
-    list_display = ('user', 'game', 'purchase_type', 'amount', 'created_at')
-    list_filter = ('purchase_type', 'created_at')
+    list_display = ('user', 'game', 'purchase_type', 'amount', 'rental_expires', 'expired', 'created_at')
+    list_filter = ('purchase_type', 'expired', 'created_at')
 
 admin.site.register(Review)
 admin.site.register(ForumCategory)
 admin.site.register(ForumTopic)
 admin.site.register(ForumPost)
-admin.site.register(GameImage)
\ No newline at end of file
+admin.site.register(GameImage)
+
+@admin.register(CatalogStats)
+class CatalogStatsAdmin(admin.ModelAdmin):
+    list_display = ('games', 'published_games', 'users', 'purchases', 'total_downloads', 'updated_at')
+    readonly_fields = [field.name for field in CatalogStats._meta.fields]
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'developer', 'amount', 'purchase', 'settlement', 'created_at')
+    list_filter = ('created_at',)
+    readonly_fields = ('developer', 'purchase', 'amount', 'settlement', 'created_at')
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ('day', 'game', 'purchase_type', 'units', 'revenue')
+    list_filter = ('purchase_type', 'day')
+
+@admin.register(GameSimilarity)
+class GameSimilarityAdmin(admin.ModelAdmin):
+    list_display = ('game', 'rank', 'similar_game', 'score', 'common_buyers')
+    raw_id_fields = ('game', 'similar_game')
@@ -0,0 +1,71 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'catalog:version'
+HITS_KEY = 'catalog:hits'
+MISSES_KEY = 'catalog:misses'
+
+
+def get_version(key=VERSION_KEY):
+    version = cache.get(key)
+    if version is None:
+        # Начинаем с отметки времени: после вытеснения ключа версия не повторится
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key=VERSION_KEY):
+    """Инвалидирует все закешированные ответы каталога за O(1)"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+def invalidate():
+    """Сбрасывает кеш каталога сейчас и еще раз после коммита: иначе
+    параллельный промах успеет сохранить данные до записи под новой версией"""
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def make_key(kind, request):
+    """Ключ считается один раз до рендера: ответ, собранный до смены версии,
+    сохраняется под старой версией и новым читателям не достанется"""
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'catalog:{get_version()}:{kind}:{url}'
+
+
+def get_payload(key):
+    payload = cache.get(key)
+    _count(MISSES_KEY if payload is None else HITS_KEY)
+    return payload
+
+
+def set_payload(key, payload):
+    cache.set(key, payload, settings.CATALOG_CACHE_TIMEOUT)
+
+
+def get_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': get_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def _count(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
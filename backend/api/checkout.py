@@ -0,0 +1,220 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import cache as catalog_cache
+from . import stats
+from .models import Game, LedgerEntry, LedgerSettlement, Purchase, User
+from .ownership import bump_version, get_entitlements
+from .rentals import rental_expires_at
+from .sales import record_sales
+
+# Доля разработчика с каждой продажи
+DEVELOPER_SHARE = Decimal('0.80')
+CENT = Decimal('0.01')
+# Максимум позиций в одной корзине
+MAX_CART_ITEMS = 50
+
+
+class CheckoutError(Exception):
+    """Покупка невозможна; текст показывается пользователю"""
+
+
+def get_amount(game, purchase_type):
+    if purchase_type == 'purchase':
+        return Decimal('0.00') if game.is_free else game.price
+    if purchase_type == 'rental':
+        if game.rental_price is None:
+            raise CheckoutError('Игра недоступна для аренды')
+        return game.rental_price
+    raise CheckoutError('Неизвестный тип покупки')
+
+
+def developer_share(amount):
+    return (amount * DEVELOPER_SHARE).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def debit(user, amount):
+    """Условное списание: UPDATE ... WHERE balance >= amount, без чтения баланса"""
+    if not amount:
+        return
+    debited = User.objects.filter(pk=user.pk, balance__gte=amount).update(
+        balance=F('balance') - amount
+    )
+    if not debited:
+        raise CheckoutError('Недостаточно средств на балансе')
+
+
+def purchase_game(user, game, purchase_type):
+    """Покупка или аренда одной игры одной транзакцией
+
+    Покупатель списывается условным UPDATE, а начисление разработчику
+    пишется в журнал: строка разработчика не блокируется на каждой продаже.
+    Продление истекшей аренды — новая строка Purchase со своей суммой и датой.
+    """
+    amount = get_amount(game, purchase_type)
+    # Быстрый отказ по кешу прав; окончательно дубль ловит unique-ограничение
+    entitlements = get_entitlements(user)
+    if purchase_type == 'rental':
+        if entitlements.is_renting(game.pk):
+            raise CheckoutError('Игра уже арендована')
+    elif entitlements.has_purchase(game.pk, purchase_type):
+        raise CheckoutError('Игра уже приобретена')
+
+    with transaction.atomic():
+        debit(user, amount)
+        if purchase_type == 'rental':
+            close_lapsed_rentals(user, [game.pk])
+        try:
+            with transaction.atomic():
+                purchase = Purchase.objects.create(
+                    user=user,
+                    game=game,
+                    purchase_type=purchase_type,
+                    amount=amount,
+                    rental_expires=rental_expires_at(game) if purchase_type == 'rental' else None,
+                )
+        except IntegrityError:
+            raise CheckoutError(
+                'Игра уже арендована' if purchase_type == 'rental' else 'Игра уже приобретена'
+            )
+        if amount:
+            LedgerEntry.objects.create(
+                developer_id=game.developer_id,
+                purchase=purchase,
+                amount=developer_share(amount),
+            )
+        record_sales([(game.pk, purchase_type, amount)])
+
+    user.refresh_from_db(fields=['balance'])
+    return purchase
+
+
+def close_lapsed_rentals(user, game_ids):
+    """Помечает истекшие, но еще не обработанные expire_rentals аренды
+
+    После этого строка продления не конфликтует с ограничением «одна
+    открытая аренда»; действующую аренду ограничение по-прежнему защищает,
+    в том числе от двух одновременных продлений.
+    """
+    closed = Purchase.objects.filter(
+        user=user, game_id__in=game_ids, purchase_type='rental',
+        expired=False, rental_expires__lte=timezone.now(),
+    ).update(expired=True)
+    if closed:
+        # update() не шлет сигналы: сбрасываем кеш прав вручную
+        bump_version(user.pk)
+        transaction.on_commit(lambda: bump_version(user.pk))
+
+
+def purchase_games(user, items):
+    """Корзина: покупка/аренда нескольких игр одной транзакцией, все или ничего
+
+    items — пары (game_id, purchase_type). Игры проверяются одним запросом,
+    уже купленные — одним запросом к Purchase, баланс списывается одним
+    условным UPDATE, покупки и записи журнала вставляются bulk_create.
+    """
+    items = list(dict.fromkeys((int(game_id), purchase_type) for game_id, purchase_type in items))
+    if not items:
+        raise CheckoutError('Корзина пуста')
+    if len(items) > MAX_CART_ITEMS:
+        raise CheckoutError(f'В корзине не больше {MAX_CART_ITEMS} позиций')
+
+    game_ids = {game_id for game_id, _ in items}
+    games = Game.objects.filter(pk__in=game_ids, status='published').in_bulk()
+    if len(games) != len(game_ids):
+        raise CheckoutError('Некоторые игры недоступны для покупки')
+    amounts = [get_amount(games[game_id], purchase_type) for game_id, purchase_type in items]
+
+    now = timezone.now()
+    with transaction.atomic():
+        owned, renting = set(), set()
+        for game_id, purchase_type, rental_expires in Purchase.objects.filter(
+            user=user, game_id__in=game_ids
+        ).values_list('game_id', 'purchase_type', 'rental_expires'):
+            if purchase_type == 'purchase':
+                owned.add(game_id)
+            elif rental_expires and rental_expires > now:
+                renting.add(game_id)
+        purchases = []
+        for (game_id, purchase_type), amount in zip(items, amounts):
+            game = games[game_id]
+            if game_id in (renting if purchase_type == 'rental' else owned):
+                raise CheckoutError(f'Игра «{game.title}» уже приобретена')
+            purchases.append(Purchase(
+                user=user,
+                game=game,
+                developer_id=game.developer_id,
+                purchase_type=purchase_type,
+                amount=amount,
+                rental_expires=rental_expires_at(game, now) if purchase_type == 'rental' else None,
+            ))
+
+        debit(user, sum(amounts, Decimal('0.00')))
+        close_lapsed_rentals(
+            user, [game_id for game_id, purchase_type in items if purchase_type == 'rental']
+        )
+        try:
+            with transaction.atomic():
+                purchases = Purchase.objects.bulk_create(purchases)
+        except IntegrityError:
+            raise CheckoutError('Игра уже приобретена')
+
+        LedgerEntry.objects.bulk_create([
+            LedgerEntry(
+                developer_id=purchase.game.developer_id,
+                purchase=purchase,
+                amount=developer_share(purchase.amount),
+            )
+            for purchase in purchases if purchase.amount
+        ])
+        record_sales(
+            (purchase.game_id, purchase.purchase_type, purchase.amount) for purchase in purchases
+        )
+        # bulk_create не шлет сигналы post_save: то же, что делают обработчики Purchase
+        stats.apply_delta(purchases=len(purchases))
+        bump_version(user.pk)
+        transaction.on_commit(lambda: bump_version(user.pk))
+
+    user.refresh_from_db(fields=['balance'])
+    return purchases
+
+
+def settle_ledger():
+    """Переносит еще не учтенные записи журнала в балансы разработчиков
+
+    Записи помечаются прогоном одной UPDATE ... WHERE settlement IS NULL,
+    и суммы считаются только по помеченным. Незафиксированная запись
+    не видна этой UPDATE и попадет в следующий прогон; два одновременных
+    прогона не пометят одну запись дважды. Одна агрегированная UPDATE
+    на разработчика. Возвращает (записей, разработчиков).
+    """
+    unsettled = LedgerEntry.objects.filter(settlement__isnull=True)
+    # Пустой прогон ничего не пишет (команда опрашивает журнал в цикле)
+    if not unsettled.exists():
+        return 0, 0
+    with transaction.atomic():
+        settlement = LedgerSettlement.objects.create()
+        settled = unsettled.update(settlement=settlement)
+        if not settled:
+            # Записи забрал параллельный прогон
+            settlement.delete()
+            return 0, 0
+        settlement.entries = settled
+        settlement.save(update_fields=['entries'])
+
+        totals = list(
+            LedgerEntry.objects.filter(settlement=settlement)
+            .values('developer_id').annotate(total=Sum('amount')).order_by()
+        )
+        for row in totals:
+            User.objects.filter(pk=row['developer_id']).update(
+                balance=F('balance') + row['total']
+            )
+
+    if totals:
+        # Баланс разработчика вложен в ответы каталога
+        catalog_cache.bump_version()
+    return settled, len(totals)
@@ -0,0 +1,95 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified для list и retrieve
+
+    Валидаторы считаются одним запросом MAX(updated_at) + COUNT(*), и при
+    совпадении ответ 304 отдается до загрузки объектов и сериализации.
+    Если у ответа есть версия (get_validator_version), ETag строится из нее
+    без запросов к БД.
+    """
+    conditional_actions = ('list', 'retrieve')
+    validator_field = 'updated_at'
+    # Last-Modified только для одного объекта: у списка MAX(updated_at) не
+    # меняется при удалении более старой строки, а точность — секунда
+    last_modified_actions = ('retrieve',)
+
+    def list(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or super().retrieve(request, *args, **kwargs)
+
+    def not_modified_response(self, request, queryset=None):
+        """HttpResponseNotModified, если у клиента актуальная копия, иначе None"""
+        self._validators = None
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        try:
+            if queryset is None:
+                queryset = self.get_validator_queryset()
+            etag, last_modified = self.get_validators(request, queryset)
+        except (TypeError, ValueError, ValidationError):
+            # Нечисловой id в URL: как get_object_or_404 в DRF
+            raise Http404
+        if self.action not in self.last_modified_actions:
+            last_modified = None
+        self._validators = (etag, last_modified)
+        return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self, request, queryset):
+        version = self.get_validator_version(request)
+        if version is not None:
+            parts = [
+                request.get_full_path(),
+                request.user.pk if request.user.is_authenticated else '',
+                *version,
+            ]
+            return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest()), None
+        probe = queryset.order_by().aggregate(
+            last_modified=Max(self.validator_field),
+            count=Count('pk'),
+        )
+        last_modified = probe['last_modified']
+        parts = [
+            request.get_full_path(),
+            probe['count'],
+            last_modified.isoformat() if last_modified else '',
+            # Ответ может содержать персональные поля
+            request.user.pk if request.user.is_authenticated else '',
+            *self.get_etag_extra(request),
+        ]
+        etag = quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def get_etag_extra(self, request):
+        """Дополнительные части ETag для данных, не отраженных в updated_at"""
+        return []
+
+    def get_validator_version(self, request):
+        """Версии, которые меняет любая запись, влияющая на ответ; None — считать по updated_at"""
+        return None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, '_validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.setdefault('Last-Modified', http_date(last_modified))
+        return response
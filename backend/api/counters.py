@@ -0,0 +1,197 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+from . import stats
+from .hll import HyperLogLog
+from .models import ForumTopic, Game, TopicViewerSketch
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedCounter:
+    """Счетчик, который копит приращения в памяти процесса и сбрасывает их пачками
+
+    Сброс — это UPDATE ... SET field = field + n, поэтому несколько воркеров
+    могут сбрасывать свои буферы независимо, ничего не теряя. Буфер
+    сбрасывается по порогу, по интервалу и при штатном завершении процесса.
+    Интервал отсчитывается от первого несброшенного приращения и соблюдается
+    фоновым потоком, даже если новых приращений больше нет. Поток стартует
+    при первом приращении, то есть уже в воркере, а не до fork.
+    """
+
+    def __init__(self, model, field, flush_interval=10, flush_threshold=100, on_flush=None):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.on_flush = on_flush
+        self._pending = Counter()
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def increment(self, pk, amount=1):
+        with self._lock:
+            if not self._pending_total:
+                # Интервал — возраст самого старого несброшенного приращения
+                self._last_flush = time.monotonic()
+            self._pending[pk] += amount
+            self._pending_total += amount
+            due = (
+                self._pending_total >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_periodically(self):
+        while True:
+            with self._lock:
+                pending = self._pending_total
+                wait = self._last_flush + self.flush_interval - time.monotonic()
+            if not pending:
+                time.sleep(self.flush_interval)
+            elif wait > 0:
+                time.sleep(wait)
+            else:
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Сбой периодического сброса %s.%s', self.model.__name__, self.field)
+                finally:
+                    # Соединение этого потока не должно висеть до следующего сброса
+                    connection.close()
+
+    def pending(self, pk):
+        """Еще не сброшенные приращения этого процесса"""
+        return self._pending.get(pk, 0)
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        # Одна UPDATE на каждое различное значение приращения
+        by_amount = defaultdict(list)
+        for pk, amount in batch.items():
+            by_amount[amount].append(pk)
+        try:
+            with transaction.atomic():
+                for amount, pks in by_amount.items():
+                    self.model.objects.filter(pk__in=pks).update(
+                        **{self.field: F(self.field) + amount}
+                    )
+                if self.on_flush:
+                    self.on_flush(batch)
+        except DatabaseError:
+            logger.exception('Не удалось сбросить счетчик %s.%s', self.model.__name__, self.field)
+            with self._lock:
+                self._pending.update(batch)
+                self._pending_total += sum(batch.values())
+            return 0
+        return sum(batch.values())
+
+
+def _downloads_flushed(batch):
+    published = Game.objects.filter(pk__in=batch, status='published').values_list('pk', flat=True)
+    stats.apply_delta(total_downloads=sum(batch[pk] for pk in published))
+    # Кеш каталога не сбрасывается: сброс раз в несколько секунд обнулял бы его
+    # целиком. Счетчик в закешированном ответе отстает не дольше
+    # CATALOG_CACHE_TIMEOUT, а несброшенное добавляет PendingDownloadsMixin
+
+
+download_counter = BufferedCounter(
+    Game,
+    'downloads',
+    flush_interval=settings.DOWNLOAD_COUNTER_FLUSH_INTERVAL,
+    flush_threshold=settings.DOWNLOAD_COUNTER_FLUSH_THRESHOLD,
+    on_flush=_downloads_flushed,
+)
+
+
+def save_viewer_sketches(sketches):
+    """Сливает скетчи зрителей {topic_id: HyperLogLog} с сохраненными и
+    обновляет оценку ForumTopic.unique_viewers; удаленные темы пропускаются"""
+    topic_ids = list(ForumTopic.objects.filter(pk__in=list(sketches)).values_list('pk', flat=True))
+    stored = TopicViewerSketch.objects.select_for_update().in_bulk(topic_ids)
+    rows, topics = [], []
+    for topic_id in topic_ids:
+        sketch = sketches[topic_id]
+        if topic_id in stored:
+            sketch.merge(HyperLogLog.from_bytes(stored[topic_id].sketch))
+        rows.append(TopicViewerSketch(topic_id=topic_id, sketch=sketch.to_bytes()))
+        topics.append(ForumTopic(pk=topic_id, unique_viewers=sketch.count()))
+    TopicViewerSketch.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['topic'], update_fields=['sketch', 'updated_at']
+    )
+    ForumTopic.objects.bulk_update(topics, ['unique_viewers'])
+
+
+class TopicViewTracker:
+    """Просмотры тем: views через BufferedCounter и HyperLogLog-скетч зрителей
+
+    Скетчи копятся в памяти рядом с приращениями и сливаются с сохраненными
+    в той же транзакции, что и сброс счетчика. Слияние скетчей идемпотентно,
+    поэтому после неудачного сброса их можно просто вернуть в буфер.
+    """
+
+    def __init__(self, flush_interval=10, flush_threshold=100):
+        self._sketches = {}
+        self._lock = threading.Lock()
+        self.counter = BufferedCounter(
+            ForumTopic,
+            'views',
+            flush_interval=flush_interval,
+            flush_threshold=flush_threshold,
+            on_flush=self._flush_sketches,
+        )
+
+    def record(self, topic_id, viewer):
+        """viewer — устойчивый ключ зрителя; в БД попадают только регистры скетча"""
+        with self._lock:
+            sketch = self._sketches.get(topic_id)
+            if sketch is None:
+                sketch = self._sketches[topic_id] = HyperLogLog()
+            sketch.add(viewer)
+        self.counter.increment(topic_id)
+
+    def pending(self, topic_id):
+        return self.counter.pending(topic_id)
+
+    def flush(self):
+        return self.counter.flush()
+
+    def _flush_sketches(self, batch):
+        with self._lock:
+            sketches, self._sketches = self._sketches, {}
+        if not sketches:
+            return
+        try:
+            save_viewer_sketches(sketches)
+        except DatabaseError:
+            with self._lock:
+                for topic_id, sketch in sketches.items():
+                    current = self._sketches.get(topic_id)
+                    self._sketches[topic_id] = sketch.merge(current) if current else sketch
+            raise
+
+
+topic_view_tracker = TopicViewTracker(
+    flush_interval=settings.TOPIC_VIEW_FLUSH_INTERVAL,
+    flush_threshold=settings.TOPIC_VIEW_FLUSH_THRESHOLD,
+)
@@ -0,0 +1,126 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """(start, end) включительно для одного диапазона bytes=...
+
+    None — заголовок игнорируется (нет, несколько диапазонов, синтаксис),
+    False — диапазон не пересекается с файлом (416).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-500: последние 500 байт
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def file_validators(field_file):
+    modified = int(field_file.storage.get_modified_time(field_file.name).timestamp())
+    etag = quote_etag(f'{modified:x}-{field_file.size:x}')
+    return etag, modified
+
+
+def if_range_matches(request, etag, modified):
+    """Range применяется, только если файл не изменился с момента, указанного в If-Range"""
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == etag
+    if value.startswith('W/'):
+        return False
+    return parse_http_date_safe(value) == modified
+
+
+def iter_file(field_file, start, length):
+    with field_file.open('rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def is_resumed(request, response):
+    """Докачка: запрошен диапазон не с начала файла
+
+    При отдаче через прокси у ответа нет Content-Range, поэтому решает
+    заголовок Range запроса. Если файл целиком отдал сам Django (Range нет
+    или If-Range не совпал), это новое скачивание.
+    """
+    if response.status_code == 200 and not getattr(settings, 'DOWNLOAD_ACCEL', None):
+        return False
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if not match:
+        return False
+    first = match.group(1)
+    # bytes=-500 — хвост файла, тоже докачка
+    return not first or int(first) > 0
+
+
+def serve_file(request, field_file):
+    """Отдает файл игры с поддержкой Range/If-Range или передает отдачу прокси"""
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    accel = getattr(settings, 'DOWNLOAD_ACCEL', None)
+    if accel:
+        # Файл отдает nginx / apache, воркер Django освобождается сразу
+        response = HttpResponse(content_type=content_type)
+        if accel == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.DOWNLOAD_ACCEL_PREFIX + field_file.name
+        else:
+            response['X-Sendfile'] = field_file.path
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    size = field_file.size
+    etag, modified = file_validators(field_file)
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and if_range_matches(request, etag, modified):
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(field_file.open('rb'), as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file(field_file, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    return response
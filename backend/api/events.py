@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Очередь событий одного подписчика в его цикле событий
+
+    Подписчик не держит поток: он ждет в get(), пока hub не положит событие
+    через call_soon_threadsafe. Переполненная очередь (клиент не успевает
+    читать) закрывается: клиент переподключится и дочитает пропущенное из БД.
+    """
+
+    def __init__(self, hub, channel, maxsize):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.hub.unsubscribe(self)
+
+    def deliver(self, event):
+        """Вызывается в цикле событий подписчика"""
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            # None после очистки — сигнал потоку завершиться
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout=None):
+        """Следующее событие; None — подписка закрыта; TimeoutError по таймауту"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class EventHub:
+    """Публикация и подписка на события по каналам внутри процесса
+
+    Доставка между процессами — забота бэкенда: LocalBackend передает
+    события только своему процессу, RedisBackend — всем воркерам через
+    Redis pub/sub. Публиковать можно из любого потока.
+    """
+
+    def __init__(self, backend, queue_size=100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Подписка из async-кода; используйте как контекстный менеджер"""
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        self.backend.start(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscriptions.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+    def publish(self, channel, event):
+        """event — словарь, сериализуемый в JSON
+
+        Доставка не гарантируется: сбой бэкенда не должен ронять запрос,
+        пропущенное клиент дочитает из БД при переподключении.
+        """
+        try:
+            self.backend.publish(channel, event)
+        except Exception:
+            logger.exception('Не удалось опубликовать событие в %s', channel)
+
+    def dispatch(self, channel, event):
+        """Раздает событие подписчикам этого процесса (вызывает бэкенд)"""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+
+class LocalBackend:
+    """События в пределах одного процесса (один воркер, разработка, тесты)"""
+
+    def start(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, event):
+        hub = getattr(self, 'hub', None)
+        if hub is not None:
+            hub.dispatch(channel, event)
+
+
+class RedisBackend:
+    """События для нескольких воркеров через Redis pub/sub (нужен пакет redis)
+
+    Каждый процесс держит одно подключение-слушатель в фоновом потоке,
+    сколько бы подписчиков у него ни было.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='events:'):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('Для RedisBackend установите пакет redis')
+        self.client = redis.Redis.from_url(url)
+        self.connection_errors = (redis.ConnectionError, redis.TimeoutError)
+        self.prefix = prefix
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self, hub):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, args=(hub,), daemon=True)
+                self._listener.start()
+
+    def publish(self, channel, event):
+        self.client.publish(self.prefix + channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    def listen(self, hub):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    self.deliver(hub, message)
+            except self.connection_errors:
+                logger.exception('Потеряно подключение к Redis, переподключение')
+                time.sleep(1)
+
+    def deliver(self, hub, message):
+        try:
+            channel = message['channel'].decode()[len(self.prefix):]
+            hub.dispatch(channel, json.loads(message['data']))
+        except (ValueError, KeyError, AttributeError):
+            logger.exception('Некорректное сообщение в канале событий')
+
+
+hub = EventHub(
+    import_string(settings.EVENTS_BACKEND)(**settings.EVENTS_BACKEND_OPTIONS),
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+)
@@ -0,0 +1,84 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Purchase
+
+EXPORT_FIELDS = (
+    'id', 'created_at', 'game_id', 'game__title', 'purchase_type',
+    'amount', 'rental_expires', 'user_id',
+)
+# Заголовки колонок CSV / ключи NDJSON
+EXPORT_COLUMNS = (
+    'id', 'created_at', 'game_id', 'game_title', 'purchase_type',
+    'amount', 'rental_expires', 'buyer_id',
+)
+CHUNK_SIZE = 2000
+
+
+class ExportError(ValueError):
+    """Некорректные параметры выгрузки"""
+
+
+def parse_day(value, name):
+    """Начало дня (aware datetime) из YYYY-MM-DD; пустое значение — None"""
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ExportError(f'Параметр {name} ожидается в формате YYYY-MM-DD')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def sales_rows(developer, date_from=None, date_to=None):
+    """Продажи игр разработчика кортежами, порциями по CHUNK_SIZE строк
+
+    values_list + iterator(): ни моделей, ни кеша результатов queryset,
+    память не зависит от объема выгрузки. date_to включительно.
+    """
+    purchases = Purchase.objects.filter(developer=developer)
+    start = parse_day(date_from, 'from')
+    end = parse_day(date_to, 'to')
+    if start:
+        purchases = purchases.filter(created_at__gte=start)
+    if end:
+        purchases = purchases.filter(created_at__lt=end + timedelta(days=1))
+    # Выгрузка идет по времени продажи: порядок индекса (developer, created_at)
+    return purchases.order_by('created_at', 'id').values_list(*EXPORT_FIELDS).iterator(
+        chunk_size=CHUNK_SIZE
+    )
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: write() возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value for value in row
+        )
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from . import cache as catalog_cache
+from .events import hub
+from .models import ForumCategory, ForumPost, ForumTopic
+from .pagination import ForumPostPagination
+from .serializers import ForumPostSerializer
+
+# Версия списка тем: ETag списка строится по ней, без агрегата по всей таблице
+TOPICS_VERSION_KEY = 'forum:topics:version'
+
+
+def get_topics_version():
+    return catalog_cache.get_version(TOPICS_VERSION_KEY)
+
+
+def topics_changed():
+    """Меняет версию списка тем; повторно после коммита, как и версию прав"""
+    catalog_cache.bump_version(TOPICS_VERSION_KEY)
+    transaction.on_commit(lambda: catalog_cache.bump_version(TOPICS_VERSION_KEY))
+
+
+def _latest_post(field):
+    return Subquery(
+        ForumPost.objects.filter(topic=OuterRef('pk'))
+        .order_by('-created_at', '-id')
+        .values(field)[:1]
+    )
+
+
+def post_added(post):
+    """Новое сообщение: +1 к счетчикам темы и категории, последнее сообщение темы
+
+    Без чтения строк: параллельные ответы не теряют приращений, а более
+    раннее сообщение не затирает более позднее last_post_at.
+    """
+    newer = When(last_post_at__gt=post.created_at, then=F('last_post_at'))
+    newer_author = When(last_post_at__gt=post.created_at, then=F('last_post_author'))
+    ForumTopic.objects.filter(pk=post.topic_id).update(
+        post_count=F('post_count') + 1,
+        last_post_at=Case(newer, default=Value(post.created_at)),
+        last_post_author=Case(newer_author, default=Value(post.author_id)),
+        updated_at=timezone.now(),
+    )
+    ForumCategory.objects.filter(topics=post.topic_id).update(post_count=F('post_count') + 1)
+
+
+def post_removed(post):
+    """-1 к счетчикам темы и категории; вызывается до удаления сообщения"""
+    ForumTopic.objects.filter(pk=post.topic_id).update(
+        post_count=F('post_count') - 1, updated_at=timezone.now()
+    )
+    ForumCategory.objects.filter(topics=post.topic_id).update(post_count=F('post_count') - 1)
+
+
+def refresh_last_post(topic_id):
+    """Последнее сообщение темы после удаления: один шаг по индексу (topic, created_at)"""
+    ForumTopic.objects.filter(pk=topic_id).update(
+        last_post_at=_latest_post('created_at'),
+        last_post_author=_latest_post('author'),
+    )
+
+
+def topic_saved(old, new):
+    """Новая тема или перенос в другую категорию
+
+    old / new — значения tracked_fields темы (category_id, post_count) до и после.
+    """
+    if old and old['category_id'] == new['category_id']:
+        return
+    if old:
+        topic_removed(old)
+    ForumCategory.objects.filter(pk=new['category_id']).update(
+        topic_count=F('topic_count') + 1,
+        post_count=F('post_count') + new['post_count'],
+    )
+
+
+def topic_removed(old):
+    ForumCategory.objects.filter(pk=old['category_id']).update(
+        topic_count=F('topic_count') - 1,
+        post_count=F('post_count') - old['post_count'],
+    )
+
+
+def reconcile():
+    """Пересчитывает все счетчики форума из сообщений (команда reconcile_forum_counters)"""
+    post_count = Subquery(
+        ForumPost.objects.filter(topic=OuterRef('pk'))
+        .order_by().values('topic').annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField(),
+    )
+    topics = ForumTopic.objects.update(
+        post_count=Coalesce(post_count, 0),
+        last_post_at=_latest_post('created_at'),
+        last_post_author=_latest_post('author'),
+    )
+    topic_totals = ForumTopic.objects.filter(category=OuterRef('pk')).order_by().values('category')
+    categories = ForumCategory.objects.update(
+        topic_count=Coalesce(Subquery(
+            topic_totals.annotate(count=Count('pk')).values('count'), output_field=IntegerField()
+        ), 0),
+        post_count=Coalesce(Subquery(
+            topic_totals.annotate(posts=Sum('post_count')).values('posts'), output_field=IntegerField()
+        ), 0),
+    )
+    return topics, categories
+
+
+# --- Живые события (SSE) ---
+
+def topic_channel(topic_id):
+    return f'forum:topic:{topic_id}'
+
+
+def post_event(post):
+    """Событие о новом сообщении; id — тот же курсор, что last в ленте сообщений"""
+    return {
+        'type': 'post',
+        'id': ForumPostPagination().encode_position(post),
+        'data': ForumPostSerializer(post).data,
+    }
+
+
+def publish_post(post):
+    hub.publish(topic_channel(post.topic_id), post_event(post))
+
+
+def posts_after(topic_id, token):
+    """Сообщения темы после курсора (Last-Event-ID) — для переподключения к потоку
+
+    Некорректный курсор дает пустой queryset: клиент просто получит новые события.
+    """
+    paginator = ForumPostPagination()
+    try:
+        position = paginator.parse_cursor(token, ForumPost)
+    except NotFound:
+        return ForumPost.objects.none()
+    return (
+        ForumPost.objects.filter(topic_id=topic_id)
+        .filter(paginator.build_keyset_filter(position))
+        .select_related('author')
+        .order_by(*paginator.ordering)
+    )
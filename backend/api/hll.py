@@ -0,0 +1,55 @@
+import hashlib
+import math
+
+# 2**12 регистров по байту: 4 КБ на скетч, стандартная ошибка ~1.6%
+PRECISION = 12
+
+
+class HyperLogLog:
+    """Приблизительный подсчет различных значений (Flajolet et al., 2007)
+
+    Хранит только регистры, а не сами значения. Скетчи объединяются
+    поэлементным максимумом, поэтому буферы разных процессов можно
+    сливать в общий скетч в любом порядке и повторно.
+    """
+
+    def __init__(self, registers=None, precision=PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError('Размер скетча не соответствует точности')
+
+    @classmethod
+    def from_bytes(cls, data, precision=PRECISION):
+        return cls(data, precision)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        rest_bits = 64 - self.precision
+        rest = hashed & ((1 << rest_bits) - 1)
+        # Позиция первой единицы в оставшихся битах (1, если старший бит уже 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.size != self.size:
+            raise ValueError('Нельзя объединить скетчи разной точности')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Малые значения: линейный подсчет по пустым регистрам точнее
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from api.checkout import CheckoutError, developer_share, purchase_game, settle_ledger
+from api.models import Game, Purchase, User
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест: параллельные покупки одной популярной игры'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        # Прогон идет в одноразовой базе с той же схемой: рабочие данные не трогаются
+        old_name = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # Файл, а не память: блокировки как у рабочей SQLite
+                connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.benchmark(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def benchmark(self, options):
+        prefix = 'bench'
+        price = Decimal('10.00')
+        developer = User.objects.create_user(username=f'{prefix}-dev', role='developer')
+        game = Game.objects.create(
+            title=f'{prefix} hot game',
+            description='benchmark',
+            short_description='benchmark',
+            developer=developer,
+            price=price,
+            status='published',
+        )
+        User.objects.bulk_create([
+            User(username=f'{prefix}-{index}', balance=price)
+            for index in range(options['buyers'])
+        ])
+        buyers = list(User.objects.filter(username__startswith=f'{prefix}-').exclude(pk=developer.pk))
+
+        def buy(buyer):
+            try:
+                for attempt in range(5):
+                    try:
+                        purchase_game(buyer, game, 'purchase')
+                        return 'ok'
+                    except OperationalError:
+                        time.sleep(0.01 * (attempt + 1))
+                return 'locked'
+            except CheckoutError:
+                return 'rejected'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(buy, buyers))
+        elapsed = time.perf_counter() - started
+
+        # Считаем по БД: повтор после блокировки мог наткнуться на уже прошедшую покупку
+        sold = Purchase.objects.filter(game=game).count()
+        self.stdout.write(
+            f'Продаж: {sold} из {len(buyers)} за {elapsed:.2f} с '
+            f'({sold / elapsed:.0f} продаж/с, потоков: {options["threads"]}); '
+            f'отклонено: {results.count("rejected")}, блокировок: {results.count("locked")}'
+        )
+
+        settle_ledger()
+        developer.refresh_from_db()
+        expected = developer_share(price) * sold
+        overdrawn = User.objects.filter(pk__in=[b.pk for b in buyers], balance__lt=0).count()
+        self.stdout.write(
+            f'Баланс разработчика: {developer.balance} (ожидалось {expected}), '
+            f'ушли в минус: {overdrawn}'
+        )
+
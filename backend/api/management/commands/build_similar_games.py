@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.recommendations import build_similarities
+
+
+class Command(BaseCommand):
+    help = 'Строит таблицу похожих игр по совместным покупкам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все игры, а не только с изменившимися покупками',
+        )
+
+    def handle(self, *args, **options):
+        games = build_similarities(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано игр: {games}'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.rentals import expire_rentals
+
+
+class Command(BaseCommand):
+    help = 'Помечает истекшие аренды пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать непрерывно')
+        parser.add_argument('--interval', type=float, default=60.0, help='Пауза между прогонами, сек')
+        parser.add_argument('--batch-size', type=int, default=None, help='Аренд за одну транзакцию')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_rentals(options['batch_size'])
+            if expired or not options['loop']:
+                self.stdout.write(f'Истекло аренд: {expired}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
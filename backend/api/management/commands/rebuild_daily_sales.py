@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.sales import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает дневные агрегаты продаж из истории покупок'
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Строк агрегатов: {rows}'))
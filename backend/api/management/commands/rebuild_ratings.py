@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.ratings import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает гистограммы и средние оценки всех игр по отзывам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Игр в одном UPDATE')
+
+    def handle(self, *args, **options):
+        games = rebuild_all(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано игр: {games}'))
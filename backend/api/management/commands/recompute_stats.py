@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводную статистику платформы с нуля'
+
+    def handle(self, *args, **options):
+        row = stats.recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f'Игр: {row.games} (опубликовано {row.published_games}), '
+            f'пользователей: {row.users}, покупок: {row.purchases}'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.forum import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики тем и сообщений форума и последнее сообщение тем'
+
+    def handle(self, *args, **options):
+        topics, categories = reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано тем: {topics}, категорий: {categories}'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.checkout import settle_ledger
+
+
+class Command(BaseCommand):
+    help = 'Переносит начисления из журнала продаж в балансы разработчиков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать непрерывно')
+        parser.add_argument('--interval', type=float, default=10.0, help='Пауза между прогонами, сек')
+
+    def handle(self, *args, **options):
+        while True:
+            entries, developers = settle_ledger()
+            if entries or not options['loop']:
+                self.stdout.write(f'Учтено записей: {entries}, разработчиков: {developers}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from api.search import DROP_TABLE_SQL, is_supported, rebuild_index
+
+
+def create_search_index(apps, schema_editor):
+    if is_supported(schema_editor.connection):
+        rebuild_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    if is_supported(schema_editor.connection):
+        schema_editor.execute(DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_game_demo_file_alter_game_cover_image_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+def backfill_tags(apps, schema_editor):
+    """Разбирает Game.tags существующих игр в таблицу тегов"""
+    Game = apps.get_model('api', 'Game')
+    Tag = apps.get_model('api', 'Tag')
+    Through = Game.tag_set.through
+    max_length = Tag._meta.get_field('name').max_length
+
+    game_tags = {}
+    for game_id, value in Game.objects.values_list('id', 'tags').iterator():
+        names = []
+        for raw in (value or '').split(','):
+            name = raw.strip().lower()[:max_length]
+            if name and name not in names:
+                names.append(name)
+        game_tags[game_id] = names
+
+    all_names = {name for names in game_tags.values() for name in names}
+    Tag.objects.bulk_create([Tag(name=name) for name in all_names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+    Through.objects.bulk_create(
+        [
+            Through(game_id=game_id, tag_id=tag_ids[name])
+            for game_id, names in game_tags.items()
+            for name in names
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_game_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='genre',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='games', to='api.tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
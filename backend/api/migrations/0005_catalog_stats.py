@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:40
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_catalog_stats(apps, schema_editor):
+    Game = apps.get_model('api', 'Game')
+    User = apps.get_model('api', 'User')
+    Purchase = apps.get_model('api', 'Purchase')
+    CatalogStats = apps.get_model('api', 'CatalogStats')
+
+    published = Q(status='published')
+    games = Game.objects.aggregate(
+        games=Count('pk'),
+        published_games=Count('pk', filter=published),
+        total_downloads=Coalesce(Sum('downloads', filter=published), 0),
+        rating_total=Coalesce(
+            Sum(F('average_rating') * F('total_ratings'), filter=published, output_field=FloatField()),
+            0.0,
+        ),
+        rating_count=Coalesce(Sum('total_ratings', filter=published), 0),
+    )
+    users = User.objects.aggregate(
+        users=Count('pk'),
+        developers=Count('pk', filter=Q(role='developer')),
+    )
+    CatalogStats.objects.update_or_create(
+        pk=1,
+        defaults={**games, **users, 'purchases': Purchase.objects.count()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_game_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('games', models.IntegerField(default=0)),
+                ('published_games', models.IntegerField(default=0)),
+                ('users', models.IntegerField(default=0)),
+                ('developers', models.IntegerField(default=0)),
+                ('purchases', models.IntegerField(default=0)),
+                ('total_downloads', models.BigIntegerField(default=0)),
+                ('rating_total', models.FloatField(default=0.0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Catalog Stats',
+            },
+        ),
+        migrations.RunPython(fill_catalog_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:05
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_rental_expires(apps, schema_editor):
+    """Старые аренды создавались без срока: считаем его от даты покупки"""
+    Purchase = apps.get_model('api', 'Purchase')
+    now = timezone.now()
+    rentals = Purchase.objects.filter(purchase_type='rental', rental_expires__isnull=True)
+    for purchase in rentals.select_related('game').iterator():
+        days = purchase.game.rental_days or settings.DEFAULT_RENTAL_DAYS
+        purchase.rental_expires = purchase.created_at + timedelta(days=days)
+        purchase.expired = purchase.rental_expires <= now
+        purchase.save(update_fields=['rental_expires', 'expired'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_developer_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['user', 'rental_expires'], name='purchase_user_rental_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(condition=models.Q(('expired', False), ('purchase_type', 'rental')), fields=['rental_expires'], name='purchase_rental_sweep_idx'),
+        ),
+        migrations.RunPython(fill_rental_expires, migrations.RunPython.noop),
+    ]
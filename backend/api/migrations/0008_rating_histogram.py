@@ -0,0 +1,58 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_rating_histogram(apps, schema_editor):
+    """Гистограмма по существующим отзывам; заодно исправляет средние, которые
+    не учитывали правки и удаления отзывов"""
+    Game = apps.get_model('api', 'Game')
+    Review = apps.get_model('api', 'Review')
+    rows = Review.objects.values('game_id').annotate(
+        **{f'ratings_{star}': Count('pk', filter=Q(rating=star)) for star in range(1, 6)}
+    ).order_by()
+    for row in rows:
+        counts = [row[f'ratings_{star}'] for star in range(1, 6)]
+        total = sum(counts)
+        Game.objects.filter(pk=row['game_id']).update(
+            **{f'ratings_{star}': counts[star - 1] for star in range(1, 6)},
+            total_ratings=total,
+            average_rating=sum(star * counts[star - 1] for star in range(1, 6)) / total,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_rental_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='ratings_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='ratings_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='ratings_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='ratings_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='ratings_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_sales(apps, schema_editor):
+    Purchase = apps.get_model('api', 'Purchase')
+    DailySales = apps.get_model('api', 'DailySales')
+    rows = Purchase.objects.annotate(day=TruncDate('created_at')).values(
+        'game_id', 'day', 'purchase_type'
+    ).annotate(units=Count('pk'), revenue=Sum('amount')).order_by()
+    DailySales.objects.bulk_create(
+        (DailySales(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchase_type', models.CharField(choices=[('purchase', 'Покупка'), ('rental', 'Аренда')], max_length=10)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.game')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Sales',
+                'ordering': ['day'],
+                'unique_together': {('game', 'day', 'purchase_type')},
+            },
+        ),
+        migrations.RunPython(fill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['topic', 'created_at'], name='post_topic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(fields=['is_pinned', 'created_at'], name='topic_pinned_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(fields=['category', 'is_pinned', 'created_at'], name='topic_category_pinned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(fields=['updated_at'], name='topic_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', 'created_at'], name='game_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['developer', 'created_at'], name='game_developer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameimage',
+            index=models.Index(fields=['game', 'order'], name='gameimage_game_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['game', 'created_at'], name='purchase_game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['game', 'created_at'], name='review_game_created_idx'),
+        ),
+    ]
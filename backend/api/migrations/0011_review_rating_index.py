@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['game', 'rating', 'created_at'], name='review_game_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_review_rating_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilaritySnapshot',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity_snapshot', serialize=False, to='api.game')),
+                ('buyers', models.IntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GameSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('common_buyers', models.IntegerField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_games', to='api.game')),
+                ('similar_game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.game')),
+            ],
+            options={
+                'verbose_name_plural': 'Game Similarities',
+                'ordering': ['rank'],
+                'unique_together': {('game', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_forum_counters(apps, schema_editor):
+    """Счетчики и последнее сообщение по уже существующим темам"""
+    ForumCategory = apps.get_model('api', 'ForumCategory')
+    ForumTopic = apps.get_model('api', 'ForumTopic')
+    ForumPost = apps.get_model('api', 'ForumPost')
+    posts = ForumPost.objects.filter(topic=OuterRef('pk')).order_by()
+    latest = posts.order_by('-created_at', '-id')
+    ForumTopic.objects.update(
+        post_count=Coalesce(Subquery(
+            posts.values('topic').annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField(),
+        ), 0),
+        last_post_at=Subquery(latest.values('created_at')[:1]),
+        last_post_author=Subquery(latest.values('author')[:1]),
+    )
+    topics = ForumTopic.objects.filter(category=OuterRef('pk')).order_by().values('category')
+    ForumCategory.objects.update(
+        topic_count=Coalesce(Subquery(
+            topics.annotate(count=Count('pk')).values('count'), output_field=IntegerField()
+        ), 0),
+        post_count=Coalesce(Subquery(
+            topics.annotate(posts=Sum('post_count')).values('posts'), output_field=IntegerField()
+        ), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_game_similarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumcategory',
+            name='post_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumcategory',
+            name='topic_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='last_post_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='post_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_forum_counters, migrations.RunPython.noop),
+    ]
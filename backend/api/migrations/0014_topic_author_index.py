@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_forum_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(fields=['author', 'is_pinned', 'created_at'], name='topic_author_pinned_idx'),
+        ),
+    ]
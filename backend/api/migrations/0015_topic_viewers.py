@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_topic_author_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicViewerSketch',
+            fields=[
+                ('topic', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='viewer_sketch', serialize=False, to='api.forumtopic')),
+                ('sketch', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='unique_viewers',
+            field=models.IntegerField(default=0),
+        ),
+    ]
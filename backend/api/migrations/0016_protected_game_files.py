@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:10
+
+import api.models
+from django.core.files.storage import storages
+from django.db import migrations, models
+
+
+def move_files(apps, source, target):
+    Game = apps.get_model('api', 'Game')
+    for game in Game.objects.only('game_file', 'demo_file').iterator():
+        for name in (game.game_file.name, game.demo_file.name):
+            if name and source.exists(name) and not target.exists(name):
+                with source.open(name, 'rb') as handle:
+                    target.save(name, handle)
+                source.delete(name)
+
+
+def to_protected(apps, schema_editor):
+    move_files(apps, storages['default'], storages['protected'])
+
+
+def to_public(apps, schema_editor):
+    move_files(apps, storages['protected'], storages['default'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_topic_viewers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='demo_file',
+            field=models.FileField(blank=True, null=True, storage=api.models.protected_storage, upload_to='demo_files/'),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='game_file',
+            field=models.FileField(blank=True, null=True, storage=api.models.protected_storage, upload_to='game_files/'),
+        ),
+        # Уже загруженные файлы переезжают из MEDIA_ROOT в защищенное хранилище
+        migrations.RunPython(to_protected, to_public),
+    ]
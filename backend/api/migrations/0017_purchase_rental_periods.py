@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_protected_game_files'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='purchase',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='purchase',
+            constraint=models.UniqueConstraint(condition=models.Q(('purchase_type', 'purchase')), fields=('user', 'game'), name='purchase_once'),
+        ),
+        migrations.AddConstraint(
+            model_name='purchase',
+            constraint=models.UniqueConstraint(condition=models.Q(('expired', False), ('purchase_type', 'rental')), fields=('user', 'game'), name='purchase_one_open_rental'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_developer(apps, schema_editor):
+    Purchase = apps.get_model('api', 'Purchase')
+    Game = apps.get_model('api', 'Game')
+    Purchase.objects.update(
+        developer_id=models.Subquery(
+            Game.objects.filter(pk=models.OuterRef('game_id')).values('developer_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_purchase_rental_periods'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='developer',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(fill_developer, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='purchase',
+            name='developer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveIndex(
+            model_name='purchase',
+            name='purchase_game_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['developer', 'created_at'], name='purchase_dev_created_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def settle_checkpointed(apps, schema_editor):
+    LedgerCheckpoint = apps.get_model('api', 'LedgerCheckpoint')
+    LedgerEntry = apps.get_model('api', 'LedgerEntry')
+    LedgerSettlement = apps.get_model('api', 'LedgerSettlement')
+    checkpoint = LedgerCheckpoint.objects.filter(pk=1).first()
+    if checkpoint is None or not checkpoint.last_entry_id:
+        return
+    entries = LedgerEntry.objects.filter(pk__lte=checkpoint.last_entry_id)
+    settlement = LedgerSettlement.objects.create(entries=entries.count())
+    entries.update(settlement=settlement)
+
+
+def unsettle_checkpointed(apps, schema_editor):
+    LedgerCheckpoint = apps.get_model('api', 'LedgerCheckpoint')
+    LedgerEntry = apps.get_model('api', 'LedgerEntry')
+    last = LedgerEntry.objects.filter(settlement__isnull=False).order_by('-pk').first()
+    LedgerCheckpoint.objects.update_or_create(pk=1, defaults={'last_entry_id': last.pk if last else 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_purchase_developer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerSettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='settlement',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='api.ledgersettlement'),
+        ),
+        # Записи до контрольной точки уже в балансах: относим их к одному прогону
+        migrations.RunPython(settle_checkpointed, unsettle_checkpointed),
+        migrations.DeleteModel(
+            name='LedgerCheckpoint',
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(condition=models.Q(('settlement__isnull', True)), fields=['id'], name='ledger_unsettled_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import storages
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 class User(AbstractUser):
@@ -16,6 +17,9 @@ class User(AbstractUser):
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Поля, изменения которых учитываются в сводной статистике
+    tracked_fields = ('role',)
+    
     # Добавляем кастомные related_name для разрешения конфликтов
     groups = models.ManyToManyField(
         'auth.Group',
@@ -38,7 +42,53 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
-class Game(models.Model):
+class Tag(models.Model):
+    """Нормализованный тег игры (индекс по полю Game.tags)"""
+    name = models.CharField(max_length=50, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def parse(cls, value):
+        """Разбирает строку 'a, B ,a' в список уникальных тегов ['a', 'b']"""
+        max_length = cls._meta.get_field('name').max_length
+        names = []
+        for raw in (value or '').split(','):
+            name = raw.strip().lower()[:max_length]
+            if name and name not in names:
+                names.append(name)
+        return names
+
+class AggregateFieldsMixin:
+    """Счетчики из aggregate_fields меняются только атомарными UPDATE
+    
+    Обычное сохранение существующей строки их не записывает, чтобы
+    устаревший объект в памяти не перезаписал накопленные значения.
+    """
+    aggregate_fields = ()
+    
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            skipped = set(self.aggregate_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+def protected_storage():
+    """Хранилище файлов игр, недоступное по публичному /media/"""
+    return storages['protected']
+
+class Game(AggregateFieldsMixin, models.Model):
     """Модель компьютерной игры"""
     STATUS_CHOICES = (
         ('draft', 'Черновик'),
@@ -59,8 +109,8 @@ class Game(models.Model):
     cover_image = models.ImageField(upload_to='game_covers/', null=True, blank=True)
     
     # Файлы игры
-    game_file = models.FileField(upload_to='game_files/', null=True, blank=True)
-    demo_file = models.FileField(upload_to='demo_files/', null=True, blank=True)
+    game_file = models.FileField(upload_to='game_files/', storage=protected_storage, null=True, blank=True)
+    demo_file = models.FileField(upload_to='demo_files/', storage=protected_storage, null=True, blank=True)
     version = models.CharField(max_length=50, default='1.0.0')
     
     # Системные требования
@@ -68,13 +118,20 @@ class Game(models.Model):
     recommended_requirements = models.TextField(blank=True)
     
     # Жанры и теги
-    genre = models.CharField(max_length=100, blank=True)
+    genre = models.CharField(max_length=100, blank=True, db_index=True)
     tags = models.CharField(max_length=500, blank=True)
+    tag_set = models.ManyToManyField(Tag, related_name='games', blank=True, editable=False)
     
     # Статистика
     downloads = models.IntegerField(default=0)
     average_rating = models.FloatField(default=0.0)
     total_ratings = models.IntegerField(default=0)
+    # Гистограмма оценок: число отзывов с 1..5 звездами
+    ratings_1 = models.IntegerField(default=0)
+    ratings_2 = models.IntegerField(default=0)
+    ratings_3 = models.IntegerField(default=0)
+    ratings_4 = models.IntegerField(default=0)
+    ratings_5 = models.IntegerField(default=0)
     
     # Статус и даты
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
@@ -82,18 +139,38 @@ class Game(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
     
+    # Поля, изменения которых учитываются в сводной статистике
+    tracked_fields = ('status', 'downloads', 'average_rating', 'total_ratings')
+    rating_fields = ('ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5')
+    aggregate_fields = ('downloads', 'average_rating', 'total_ratings') + rating_fields
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Каталог: опубликованные игры по дате (keyset-пагинация)
+            models.Index(fields=['status', 'created_at'], name='game_status_created_idx'),
+            # Игры разработчика по дате (my_games)
+            models.Index(fields=['developer', 'created_at'], name='game_developer_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
-    def update_rating(self, new_rating):
-        """Обновляет средний рейтинг игры"""
-        total_score = self.average_rating * self.total_ratings + new_rating
-        self.total_ratings += 1
-        self.average_rating = total_score / self.total_ratings
-        self.save()
+    def rating_histogram(self):
+        """Число оценок по звездам: {"1": n1, ..., "5": n5}"""
+        return {
+            str(star): getattr(self, name)
+            for star, name in enumerate(self.rating_fields, start=1)
+        }
+    
+    def sync_tags(self):
+        """Приводит связи tag_set в соответствие со строкой tags"""
+        names = Tag.parse(self.tags)
+        current = set(self.tag_set.values_list('name', flat=True))
+        if current == set(names):
+            return
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        self.tag_set.set(Tag.objects.filter(name__in=names))
 
 class GameImage(models.Model):
     """Дополнительные изображения для игры"""
@@ -103,6 +180,9 @@ class GameImage(models.Model):
     
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['game', 'order'], name='gameimage_game_order_idx'),
+        ]
 
 class Purchase(models.Model):
     """Модель покупки/аренды игры"""
@@ -113,17 +193,129 @@ class Purchase(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purchases')
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='purchases')
+    # Копия game.developer: продажи разработчика по времени читаются одним индексом
+    developer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales')
     purchase_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     rental_expires = models.DateTimeField(null=True, blank=True)
+    # Выставляется командой expire_rentals, когда срок аренды прошел
+    expired = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ['user', 'game', 'purchase_type']
+        constraints = [
+            # Игра покупается один раз
+            models.UniqueConstraint(
+                fields=['user', 'game'],
+                condition=models.Q(purchase_type='purchase'),
+                name='purchase_once',
+            ),
+            # Каждое продление аренды — новая строка, но действующая аренда одна:
+            # перед продлением истекшая помечается expired
+            models.UniqueConstraint(
+                fields=['user', 'game'],
+                condition=models.Q(purchase_type='rental', expired=False),
+                name='purchase_one_open_rental',
+            ),
+        ]
+        indexes = [
+            # Активные аренды пользователя: диапазон по rental_expires
+            models.Index(fields=['user', 'rental_expires'], name='purchase_user_rental_idx'),
+            # Продажи разработчика по дате (выгрузка продаж)
+            models.Index(fields=['developer', 'created_at'], name='purchase_dev_created_idx'),
+            # Очередь для expire_rentals: только еще не истекшие аренды
+            models.Index(
+                fields=['rental_expires'],
+                condition=models.Q(purchase_type='rental', expired=False),
+                name='purchase_rental_sweep_idx',
+            ),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if self.developer_id is None:
+            self.developer_id = self.game.developer_id
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.user.username} - {self.game.title} ({self.get_purchase_type_display()})"
 
+class LedgerSettlement(models.Model):
+    """Один прогон settle_ledger: какие записи журнала перенесены в балансы"""
+    entries = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Перенос #{self.pk}: {self.entries} записей"
+
+class LedgerEntry(models.Model):
+    """Начисление разработчику за продажу. Записи только добавляются"""
+    developer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_entries')
+    purchase = models.ForeignKey(
+        Purchase, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Прогон, перенесший запись в баланс разработчика; пусто — еще не перенесена
+    settlement = models.ForeignKey(
+        LedgerSettlement, on_delete=models.PROTECT, null=True, blank=True, related_name='ledger_entries'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'Ledger Entries'
+        indexes = [
+            # Очередь для settle_ledger: только еще не перенесенные записи
+            models.Index(
+                fields=['id'], condition=models.Q(settlement__isnull=True), name='ledger_unsettled_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.developer.username} +{self.amount}"
+
+class DailySales(models.Model):
+    """Продажи игры за день по типу покупки; пополняется при оформлении покупки"""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    purchase_type = models.CharField(max_length=10, choices=Purchase.TYPE_CHOICES)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['game', 'day', 'purchase_type']
+        ordering = ['day']
+        verbose_name_plural = 'Daily Sales'
+    
+    def __str__(self):
+        return f"{self.game.title} {self.day}: {self.units} ({self.purchase_type})"
+
+class GameSimilarity(models.Model):
+    """Top-K похожих игр по совместным покупкам; строит команда build_similar_games"""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='similar_games')
+    similar_game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    common_buyers = models.IntegerField()
+    
+    class Meta:
+        ordering = ['rank']
+        unique_together = ['game', 'rank']
+        verbose_name_plural = 'Game Similarities'
+    
+    def __str__(self):
+        return f"{self.game_id} -> {self.similar_game_id} ({self.score:.3f})"
+
+class SimilaritySnapshot(models.Model):
+    """Число покупателей игры на момент последнего расчета похожих игр"""
+    game = models.OneToOneField(
+        Game, on_delete=models.CASCADE, primary_key=True, related_name='similarity_snapshot'
+    )
+    buyers = models.IntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.game_id}: {self.buyers}"
+
 class Review(models.Model):
     """Отзывы на игры"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
@@ -133,18 +325,31 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Поля, изменения которых учитываются в рейтинге игры
+    tracked_fields = ('game_id', 'rating')
+    
     class Meta:
         unique_together = ['user', 'game']
+        indexes = [
+            models.Index(fields=['game', 'created_at'], name='review_game_created_idx'),
+            models.Index(fields=['game', 'rating', 'created_at'], name='review_game_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.game.title} ({self.rating}/5)"
 
-class ForumCategory(models.Model):
+class ForumCategory(AggregateFieldsMixin, models.Model):
     """Категории форума"""
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     order = models.IntegerField(default=0)
     
+    # Счетчики активности (api.forum)
+    topic_count = models.IntegerField(default=0)
+    post_count = models.IntegerField(default=0)
+    
+    aggregate_fields = ('topic_count', 'post_count')
+    
     class Meta:
         verbose_name_plural = 'Forum Categories'
         ordering = ['order']
@@ -152,7 +357,7 @@ class ForumCategory(models.Model):
     def __str__(self):
         return self.name
 
-class ForumTopic(models.Model):
+class ForumTopic(AggregateFieldsMixin, models.Model):
     """Темы на форуме"""
     title = models.CharField(max_length=200)
     content = models.TextField()
@@ -164,8 +369,34 @@ class ForumTopic(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Счетчики активности (api.forum)
+    post_count = models.IntegerField(default=0)
+    last_post_at = models.DateTimeField(null=True, blank=True)
+    last_post_author = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    # Оценка по HyperLogLog-скетчу TopicViewerSketch (api.counters)
+    unique_viewers = models.IntegerField(default=0)
+    
+    # views и unique_viewers пишет сброс буфера просмотров
+    aggregate_fields = ('post_count', 'last_post_at', 'last_post_author', 'views', 'unique_viewers')
+    # Перенос темы в другую категорию переносит ее счетчики
+    tracked_fields = ('category_id', 'post_count')
+    
     class Meta:
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            # Список тем целиком, по категории и по автору в порядке ordering
+            models.Index(fields=['is_pinned', 'created_at'], name='topic_pinned_created_idx'),
+            models.Index(
+                fields=['category', 'is_pinned', 'created_at'], name='topic_category_pinned_idx'
+            ),
+            models.Index(
+                fields=['author', 'is_pinned', 'created_at'], name='topic_author_pinned_idx'
+            ),
+            # MAX(updated_at) для ETag списка тем читается из индекса
+            models.Index(fields=['updated_at'], name='topic_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -180,6 +411,45 @@ class ForumPost(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['topic', 'created_at'], name='post_topic_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.author.username} - {self.topic.title[:50]}"
+
+class TopicViewerSketch(models.Model):
+    """HyperLogLog-скетч зрителей темы: несколько КБ вместо строки на каждого зрителя"""
+    topic = models.OneToOneField(
+        ForumTopic, on_delete=models.CASCADE, primary_key=True, related_name='viewer_sketch'
+    )
+    sketch = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.author.username} - {self.topic.title[:50]}"
\ No newline at end of file
+        return f"{self.topic_id}: {len(self.sketch)} байт"
+
+class CatalogStats(models.Model):
+    """Сводная статистика платформы: одна строка, поддерживается сигналами"""
+    games = models.IntegerField(default=0)
+    published_games = models.IntegerField(default=0)
+    users = models.IntegerField(default=0)
+    developers = models.IntegerField(default=0)
+    purchases = models.IntegerField(default=0)
+    # Скачивания и оценки считаются только по опубликованным играм
+    total_downloads = models.BigIntegerField(default=0)
+    rating_total = models.FloatField(default=0.0)
+    rating_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Catalog Stats'
+    
+    def __str__(self):
+        return f"Статистика на {self.updated_at:%d.%m.%Y %H:%M}"
+    
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0.0
+        return self.rating_total / self.rating_count
@@ -0,0 +1,154 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Purchase
+
+
+def _version_key(user_id):
+    return f'ownership:{user_id}:version'
+
+
+def get_version(user):
+    """Версия покупок пользователя: меняется при каждой записи Purchase"""
+    if user is None or not user.is_authenticated:
+        return 0
+    key = _version_key(user.pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        pass
+
+
+class Entitlements:
+    """Компактный набор прав пользователя: купленные игры и аренды со сроком"""
+
+    def __init__(self, owned=(), rentals=None):
+        self.owned = frozenset(owned)
+        # game_id -> rental_expires (None, если срок не задан)
+        self.rentals = dict(rentals or {})
+
+    @classmethod
+    def load(cls, user_id):
+        owned, rentals = [], {}
+        rows = Purchase.objects.filter(user_id=user_id).values_list(
+            'game_id', 'purchase_type', 'rental_expires'
+        )
+        for game_id, purchase_type, rental_expires in rows:
+            if purchase_type == 'purchase':
+                owned.append(game_id)
+            elif purchase_type == 'rental':
+                # Каждое продление — отдельная строка: важна самая поздняя
+                current = rentals.get(game_id)
+                if current is None or (rental_expires and rental_expires > current):
+                    rentals[game_id] = rental_expires
+        return cls(owned, rentals)
+
+    def owns(self, game_id):
+        return game_id in self.owned
+
+    def is_renting(self, game_id):
+        expires = self.rentals.get(game_id)
+        return bool(expires and expires > timezone.now())
+
+    def has_purchase(self, game_id, purchase_type):
+        """Есть ли строка Purchase этого типа (в т.ч. истекшая аренда)"""
+        if purchase_type == 'purchase':
+            return game_id in self.owned
+        return game_id in self.rentals
+
+    def has_any(self, game_id):
+        return game_id in self.owned or game_id in self.rentals
+
+
+EMPTY_ENTITLEMENTS = Entitlements()
+
+
+def get_entitlements(user):
+    """Права пользователя из кеша; ключ содержит версию, которую сбрасывает запись Purchase"""
+    if user is None or not user.is_authenticated:
+        return EMPTY_ENTITLEMENTS
+    # Версия читается до загрузки: покупка во время загрузки сменит ключ
+    key = f'entitlements:{user.pk}:{get_version(user)}'
+    entitlements = cache.get(key)
+    if entitlements is None:
+        entitlements = Entitlements.load(user.pk)
+        cache.set(key, entitlements, settings.ENTITLEMENTS_CACHE_TIMEOUT)
+    return entitlements
+
+
+def _confirm_in_db(user, purchases):
+    """Перепроверка отказа по кешу: кеш (например, LocMem другого воркера)
+    мог не увидеть свежую покупку. Найденная строка сбрасывает версию прав"""
+    if user is None or not user.is_authenticated:
+        return False
+    if not purchases.filter(user_id=user.pk).exists():
+        return False
+    bump_version(user.pk)
+    return True
+
+
+def can_access(user, game_id):
+    """Куплена или арендована сейчас; для проверок прав, а не для отображения"""
+    entitlements = get_entitlements(user)
+    if entitlements.owns(game_id) or entitlements.is_renting(game_id):
+        return True
+    return _confirm_in_db(user, Purchase.objects.filter(
+        Q(purchase_type='purchase') | Q(purchase_type='rental', rental_expires__gt=timezone.now()),
+        game_id=game_id,
+    ))
+
+
+def has_purchased(user, game_id):
+    """Есть ли любая покупка или аренда игры (в т.ч. истекшая), с перепроверкой отказа в БД"""
+    if get_entitlements(user).has_any(game_id):
+        return True
+    return _confirm_in_db(user, Purchase.objects.filter(game_id=game_id))
+
+
+class OwnershipResolver:
+    """Флаги is_owned / is_rented пользователя в пределах одного ответа"""
+
+    context_key = 'ownership'
+
+    def __init__(self, user=None):
+        self.user = user if user is not None and user.is_authenticated else None
+        self._entitlements = None
+
+    @classmethod
+    def for_context(cls, context):
+        """Один резолвер на корневой сериализатор (контекст общий для вложенных)"""
+        resolver = context.get(cls.context_key)
+        if resolver is None:
+            request = context.get('request')
+            resolver = cls(getattr(request, 'user', None))
+            context[cls.context_key] = resolver
+        return resolver
+
+    @property
+    def entitlements(self):
+        if self._entitlements is None:
+            self._entitlements = get_entitlements(self.user)
+        return self._entitlements
+
+    def prime(self, game_ids):
+        """Загружает права заранее; набор общий для всех игр, поэтому game_ids не важны"""
+        if self.user is not None:
+            self.entitlements
+
+    def is_owned(self, game_id):
+        return self.entitlements.owns(game_id)
+
+    def is_rented(self, game_id):
+        return self.entitlements.is_renting(game_id)
@@ -0,0 +1,234 @@
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset-пагинация: курсор хранит значения полей сортировки последней строки"""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    # Время жизни закешированного общего количества строк (None — не считать)
+    count_cache_timeout = 60
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_queryset = queryset
+        self.count = self.get_count(queryset, request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.build_keyset_filter(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                size = int(value)
+            except ValueError:
+                size = 0
+            if size > 0:
+                return min(size, self.max_page_size)
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_position(self.page[-1]))
+
+    # --- Курсор ---
+
+    def get_position(self, obj):
+        return [getattr(obj, name.lstrip('-')) for name in self.ordering]
+
+    def encode_position(self, obj):
+        values = [self._dump_value(value) for value in self.get_position(obj)]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def get_cursor_token(self, request):
+        return request.query_params.get(self.cursor_query_param)
+
+    def decode_cursor(self, request, model=None):
+        token = self.get_cursor_token(request)
+        if not token:
+            return None
+        return self.parse_cursor(token, model)
+
+    def parse_cursor(self, token, model=None):
+        """Значения курсора; с model каждое приводится к типу своего поля
+        
+        Иначе курсор вида ["x","x"] дошел бы до фильтра и упал в нем.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if model is not None:
+            values = [
+                self._load_value(model._meta.get_field(name.lstrip('-')), value)
+                for name, value in zip(self.ordering, values)
+            ]
+        return values
+
+    def build_keyset_filter(self, values):
+        """(a, b, c) "после" (va, vb, vc) с учетом направления каждого поля"""
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {
+                prev.lstrip('-'): values[i]
+                for i, prev in enumerate(self.ordering[:index])
+            }
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[index]}))
+        return reduce(lambda left, right: left | right, conditions)
+
+    def _load_value(self, field, value):
+        if value is None or isinstance(value, (list, dict)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return field.to_python(value)
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _dump_value(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    # --- Количество ---
+
+    def get_count(self, queryset, request):
+        """COUNT(*) кешируется по набору фильтров, а не выполняется на каждой странице"""
+        if self.count_cache_timeout is None:
+            return None
+        params = remove_query_param(request.get_full_path(), self.cursor_query_param)
+        params = remove_query_param(params, self.page_size_query_param)
+        key = 'pagination:count:' + hashlib.md5(params.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+
+class GameCursorPagination(KeysetPagination):
+    """Пагинация каталога опубликованных игр"""
+    ordering = ('-created_at', '-id')
+    page_size = getattr(settings, 'CATALOG_PAGE_SIZE', 20)
+    max_page_size = getattr(settings, 'CATALOG_MAX_PAGE_SIZE', 100)
+    count_cache_timeout = getattr(settings, 'CATALOG_COUNT_CACHE_TIMEOUT', 60)
+
+
+class ForumTopicPagination(KeysetPagination):
+    """Список тем в порядке ForumTopic.Meta.ordering: закрепленные, затем новые"""
+    ordering = ('-is_pinned', '-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+
+
+class ForumPostPagination(KeysetPagination):
+    """Сообщения темы по порядку: ?cursor= — следующая страница, ?after= — только новые
+    
+    В ответе last — курсор последнего отданного сообщения. Клиент передает
+    его в ?after=, чтобы дозагрузить ответы, появившиеся после него: это
+    один диапазонный запрос по индексу (topic, created_at).
+    Общее число сообщений берется из ForumTopic.post_count.
+    """
+    ordering = ('created_at', 'id')
+    page_size = 50
+    max_page_size = 200
+    after_query_param = 'after'
+    count_cache_timeout = None
+
+    def get_cursor_token(self, request):
+        return super().get_cursor_token(request) or request.query_params.get(self.after_query_param)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        # Пустая страница: новых сообщений нет, курсор клиента остается прежним
+        response.data['last'] = (
+            self.encode_position(self.page[-1]) if self.page
+            else self.get_cursor_token(self.request)
+        )
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['last'] = {'type': 'string', 'nullable': True}
+        return response_schema
+
+    def get_next_link(self):
+        link = super().get_next_link()
+        return link and remove_query_param(link, self.after_query_param)
+
+
+class ReviewFeedPagination(KeysetPagination):
+    """Лента отзывов игры: ?sort=newest (по умолчанию) или ?sort=rating
+    
+    Общее число отзывов берется из гистограммы игры, COUNT не выполняется.
+    """
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'rating': ('-rating', '-created_at', '-id'),
+    }
+    sort_query_param = 'sort'
+    page_size = 10
+    max_page_size = 50
+    count_cache_timeout = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = self.get_ordering(request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request):
+        sort = request.query_params.get(self.sort_query_param, 'newest')
+        return self.orderings.get(sort, self.orderings['newest'])
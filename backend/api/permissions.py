@@ -33,14 +33,8 @@ class CanPurchaseGame(permissions.BasePermission):
         # Проверяем, не куплена ли уже игра
         game_id = view.kwargs.get('game_id')
         if game_id:
-            from .models import Purchase
-            already_purchased = Purchase.objects.filter(
-                user=request.user,
-                game_id=game_id,
-                purchase_type='purchase'
-            ).exists()
-            
-            if already_purchased:
+            from .ownership import get_entitlements
+            if get_entitlements(request.user).owns(int(game_id)):
                 return False
         
         return True
\ No newline at end of file
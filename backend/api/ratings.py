@@ -0,0 +1,76 @@
+from django.db.models import Count, F, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from . import cache as catalog_cache
+from . import stats
+from .models import Game, Review
+
+STARS = range(1, 6)
+
+
+def rating_field(star):
+    return f'ratings_{star}'
+
+
+def apply_review_delta(game_id, added=None, removed=None):
+    """Учитывает появление оценки added и/или исчезновение оценки removed
+
+    Один UPDATE с F()-выражениями: гистограмма сдвигается атомарно, а
+    total_ratings и average_rating пересчитываются из нее же в той же строке,
+    без чтения игры и без гонок между параллельными отзывами.
+    """
+    deltas = {star: 0 for star in STARS}
+    if added:
+        deltas[added] += 1
+    if removed:
+        deltas[removed] -= 1
+    if not any(deltas.values()):
+        return
+
+    # Правые части UPDATE вычисляются по значениям строки до изменения
+    counts = {star: F(rating_field(star)) + deltas[star] for star in STARS}
+    total = sum(counts.values())
+    score = sum(star * count for star, count in counts.items())
+    changes = {rating_field(star): counts[star] for star in STARS if deltas[star]}
+    changes.update(
+        total_ratings=total,
+        average_rating=Coalesce(Cast(score, FloatField()) / NullIf(total, Value(0)), Value(0.0)),
+    )
+
+    games = Game.objects.filter(pk=game_id)
+    # Сводная статистика учитывает только опубликованные игры
+    if games.filter(status='published').update(**changes):
+        stats.apply_delta(
+            rating_total=sum(star * delta for star, delta in deltas.items()),
+            rating_count=sum(deltas.values()),
+        )
+    elif not games.update(**changes):
+        return
+    catalog_cache.invalidate()
+
+
+def rebuild_all(batch_size=500):
+    """Пересчитывает гистограммы всех игр одним сгруппированным запросом к отзывам"""
+    rows = Review.objects.values('game_id').annotate(
+        **{rating_field(star): Count('pk', filter=Q(rating=star)) for star in STARS}
+    ).order_by()
+    histograms = {row.pop('game_id'): row for row in rows}
+
+    empty = {rating_field(star): 0 for star in STARS}
+    games = []
+    for game in Game.objects.only('pk').iterator():
+        counts = histograms.get(game.pk, empty)
+        total = sum(counts.values())
+        score = sum(star * counts[rating_field(star)] for star in STARS)
+        for name, value in counts.items():
+            setattr(game, name, value)
+        game.total_ratings = total
+        game.average_rating = score / total if total else 0.0
+        games.append(game)
+
+    Game.objects.bulk_update(
+        games, [*Game.rating_fields, 'total_ratings', 'average_rating'], batch_size=batch_size
+    )
+    stats.recompute()
+    catalog_cache.invalidate()
+    return len(games)
@@ -0,0 +1,109 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import GameSimilarity, Purchase, SimilaritySnapshot
+
+
+def buyer_counts():
+    """game_id -> число различных покупателей (покупка или аренда)"""
+    rows = Purchase.objects.values('game_id').annotate(
+        buyers=Count('user_id', distinct=True)
+    ).order_by()
+    return {row['game_id']: row['buyers'] for row in rows}
+
+
+def load_baskets(game_ids=None):
+    """Разреженная матрица пользователь x игра: user_id -> множество game_id
+
+    С game_ids загружаются только пользователи, купившие хотя бы одну из игр.
+    """
+    pairs = Purchase.objects.values_list('user_id', 'game_id').order_by()
+    if game_ids is not None:
+        buyers = Purchase.objects.filter(game_id__in=game_ids).values('user_id')
+        pairs = pairs.filter(user_id__in=buyers)
+    baskets = defaultdict(set)
+    for user_id, game_id in pairs.iterator(chunk_size=5000):
+        baskets[user_id].add(game_id)
+    return baskets
+
+
+def co_purchases(baskets, game_ids=None):
+    """Ненулевые элементы A^T A: game_id -> Counter(other_id -> общих покупателей)"""
+    max_basket = settings.SIMILAR_GAMES_MAX_BASKET
+    counts = defaultdict(Counter)
+    for games in baskets.values():
+        if len(games) < 2 or len(games) > max_basket:
+            continue
+        for game_id in games:
+            if game_ids is None or game_id in game_ids:
+                row = counts[game_id]
+                row.update(games)
+                row[game_id] -= 1
+    return counts
+
+
+def top_neighbours(game_id, row, buyers):
+    """K ближайших по косинусу бинарных векторов покупателей:
+    common / sqrt(buyers_a * buyers_b)"""
+    min_common = settings.SIMILAR_GAMES_MIN_COMMON
+    candidates = (
+        (common / math.sqrt(buyers[game_id] * buyers[other]), other, common)
+        for other, common in row.items()
+        if other != game_id and common >= min_common
+    )
+    return heapq.nlargest(settings.SIMILAR_GAMES_TOP_K, candidates)
+
+
+def build_similarities(full=False):
+    """Пересчитывает похожие игры, возвращает число пересчитанных игр
+
+    Без full пересчитываются только игры, у которых изменилось число
+    покупателей, игры, покупавшиеся вместе с ними, и игры, чьи сохраненные
+    соседи среди изменившихся: косинус остальных пар от изменений не зависит.
+    """
+    buyers = buyer_counts()
+    stored = dict(SimilaritySnapshot.objects.values_list('game_id', 'buyers'))
+    if full:
+        changed = targets = None
+    else:
+        changed = {game_id for game_id, count in buyers.items() if stored.get(game_id) != count}
+        changed |= set(stored) - set(buyers)
+        if not changed:
+            return 0
+        targets = changed | {
+            game_id for games in load_baskets(changed).values() for game_id in games
+        }
+        # После удаления покупки общих покупателей уже нет, а строки соседей остались
+        targets |= set(
+            GameSimilarity.objects.filter(similar_game_id__in=changed).values_list('game_id', flat=True)
+        )
+
+    counts = co_purchases(load_baskets(targets), targets)
+    rows = [
+        GameSimilarity(
+            game_id=game_id, similar_game_id=other, rank=rank, score=score, common_buyers=common
+        )
+        for game_id, row in counts.items()
+        for rank, (score, other, common) in enumerate(top_neighbours(game_id, row, buyers), start=1)
+    ]
+    snapshots = [
+        SimilaritySnapshot(game_id=game_id, buyers=count)
+        for game_id, count in buyers.items()
+        if changed is None or game_id in changed
+    ]
+
+    with transaction.atomic():
+        if full:
+            GameSimilarity.objects.all().delete()
+            SimilaritySnapshot.objects.all().delete()
+        else:
+            GameSimilarity.objects.filter(game_id__in=targets).delete()
+            SimilaritySnapshot.objects.filter(game_id__in=changed).delete()
+        GameSimilarity.objects.bulk_create(rows, batch_size=1000)
+        SimilaritySnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(buyers) if full else len(targets)
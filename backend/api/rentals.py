@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import ownership
+from .models import Purchase
+
+
+def rental_expires_at(game, start=None):
+    """Окончание аренды, начатой сейчас (или в start)"""
+    days = game.rental_days or settings.DEFAULT_RENTAL_DAYS
+    return (start or timezone.now()) + timedelta(days=days)
+
+
+def active_rentals(user):
+    """Действующие аренды пользователя, ближайшие к окончанию первыми
+
+    Фильтр и сортировка совпадают с индексом (user, rental_expires): выборка
+    остается range scan по индексу при любом объеме истории аренд. Покупки
+    сюда не попадают, у них rental_expires пустой.
+    """
+    return Purchase.objects.filter(
+        user=user, rental_expires__gt=timezone.now()
+    ).order_by('rental_expires')
+
+
+def expire_rentals(batch_size=None):
+    """Помечает истекшие аренды пачками, возвращает число помеченных
+
+    Очередь читается по частичному индексу, поэтому стоимость пачки
+    не зависит от числа уже обработанных аренд.
+    """
+    batch_size = batch_size or settings.RENTAL_EXPIRY_BATCH_SIZE
+    expired = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                Purchase.objects.filter(
+                    purchase_type='rental', expired=False, rental_expires__lte=now
+                ).order_by('rental_expires').values_list('pk', 'user_id')[:batch_size]
+            )
+            if not batch:
+                break
+            Purchase.objects.filter(pk__in=[pk for pk, _ in batch]).update(expired=True)
+        # update() не шлет сигналы: сбрасываем кеш прав вручную
+        for user_id in {user_id for _, user_id in batch}:
+            ownership.bump_version(user_id)
+        expired += len(batch)
+        if len(batch) < batch_size:
+            break
+    return expired
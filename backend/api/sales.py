@@ -0,0 +1,90 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySales, Game, Purchase
+
+# Предел окна для эндпоинта продаж, дней
+MAX_SERIES_DAYS = 366
+
+
+def record_sales(sales, day=None):
+    """Прибавляет продажи к дневным агрегатам
+
+    sales — тройки (game_id, purchase_type, amount). Одна UPDATE ... F() на
+    каждую пару (игра, тип); строка дня создается при первой продаже.
+    Вызывается внутри транзакции покупки.
+    """
+    day = day or timezone.localdate()
+    totals = defaultdict(lambda: [0, Decimal('0.00')])
+    for game_id, purchase_type, amount in sales:
+        total = totals[game_id, purchase_type]
+        total[0] += 1
+        total[1] += amount
+
+    for (game_id, purchase_type), (units, revenue) in totals.items():
+        row = DailySales.objects.filter(game_id=game_id, day=day, purchase_type=purchase_type)
+        changes = {'units': F('units') + units, 'revenue': F('revenue') + revenue}
+        if row.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DailySales.objects.create(
+                    game_id=game_id, day=day, purchase_type=purchase_type,
+                    units=units, revenue=revenue,
+                )
+        except IntegrityError:
+            # Строку дня успела создать параллельная покупка
+            row.update(**changes)
+
+
+def rebuild():
+    """Пересобирает агрегаты из Purchase одним сгруппированным запросом
+
+    Каждое продление аренды — своя строка Purchase, поэтому пересборка
+    совпадает с агрегатами, накопленными record_sales.
+    """
+    rows = Purchase.objects.annotate(day=TruncDate('created_at')).values(
+        'game_id', 'day', 'purchase_type'
+    ).annotate(units=Count('pk'), revenue=Sum('amount')).order_by()
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        created = DailySales.objects.bulk_create(
+            (DailySales(**row) for row in rows.iterator()), batch_size=1000
+        )
+    return len(created)
+
+
+def sales_series(developer, days=90, game_id=None):
+    """Дневные ряды продаж игр разработчика за последние days дней
+
+    Читает только DailySales: строк не больше игр x дней x типов,
+    сколько бы покупок ни было.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    # Игры разработчика подзапросом IN: DailySales читается по индексу
+    # (game, day, purchase_type) уже в порядке ORDER BY, без сортировки
+    games = Game.objects.filter(developer=developer)
+    if game_id is not None:
+        games = games.filter(pk=game_id)
+    rows = DailySales.objects.filter(game__in=games.values('pk'), day__gte=since).values_list(
+        'game_id', 'game__title', 'day', 'purchase_type', 'units', 'revenue'
+    ).order_by('game_id', 'day', 'purchase_type')
+
+    games = {}
+    for game_id, title, day, purchase_type, units, revenue in rows:
+        game = games.setdefault(game_id, {
+            'game_id': game_id, 'title': title,
+            'units': 0, 'revenue': Decimal('0.00'), 'series': [],
+        })
+        game['units'] += units
+        game['revenue'] += revenue
+        game['series'].append({
+            'day': day, 'purchase_type': purchase_type, 'units': units, 'revenue': revenue,
+        })
+    return {'since': since, 'days': days, 'games': list(games.values())}
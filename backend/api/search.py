@@ -0,0 +1,111 @@
+import html
+import re
+
+from django.db import connection
+
+FTS_TABLE = 'api_game_fts'
+FTS_COLUMNS = ('title', 'short_description', 'description', 'genre', 'tags')
+# Веса BM25 по колонкам: совпадение в названии важнее, чем в описании
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 3.0, 3.0)
+MAX_QUERY_TERMS = 10
+HIGHLIGHT_OPEN = '<mark>'
+HIGHLIGHT_CLOSE = '</mark>'
+# FTS5 расставляет маркеры символами из Private Use Area: текст игры
+# экранируется целиком, и только потом маркеры заменяются на <mark>
+MARKER_OPEN = '\ue000'
+MARKER_CLOSE = '\ue001'
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(FTS_COLUMNS)}, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_TABLE_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+
+def is_supported(conn=None):
+    """Полнотекстовый индекс есть только на SQLite (FTS5)"""
+    return (conn or connection).vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Превращает пользовательский ввод в безопасный FTS5-запрос: все слова, по префиксу"""
+    terms = re.findall(r'\w+', text or '')[:MAX_QUERY_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_game(game):
+    if not is_supported():
+        return
+    values = [getattr(game, column) or '' for column in FTS_COLUMNS]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [game.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(FTS_COLUMNS))})",
+            [game.pk, *values],
+        )
+
+
+def remove_game(game_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [game_id])
+
+
+def rebuild_index(conn=None):
+    """Полностью перестраивает индекс одним INSERT ... SELECT; возвращает число строк"""
+    conn = conn or connection
+    if not is_supported(conn):
+        return 0
+    columns = ', '.join(FTS_COLUMNS)
+    source = ', '.join(f"COALESCE({column}, '')" for column in FTS_COLUMNS)
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {source} FROM api_game"
+        )
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def render_highlight(text):
+    """HTML-безопасный фрагмент: текст разработчика экранирован, совпадения в <mark>"""
+    return (
+        html.escape(text or '')
+        .replace(MARKER_OPEN, HIGHLIGHT_OPEN)
+        .replace(MARKER_CLOSE, HIGHLIGHT_CLOSE)
+    )
+
+
+def search_games(text, limit=20, offset=0):
+    """Опубликованные игры по релевантности BM25: [(game_id, rank, title, snippet)]
+
+    title и snippet — экранированный HTML с совпадениями в <mark>.
+    """
+    match = build_match_query(text)
+    if not match or not is_supported():
+        return []
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    sql = (
+        f"SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+        f"highlight({FTS_TABLE}, 0, %s, %s), "
+        f"snippet({FTS_TABLE}, -1, %s, %s, '…', 16) "
+        f"FROM {FTS_TABLE} JOIN api_game ON api_game.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND api_game.status = 'published' "
+        f"ORDER BY rank LIMIT %s OFFSET %s"
+    )
+    params = [
+        MARKER_OPEN, MARKER_CLOSE,
+        MARKER_OPEN, MARKER_CLOSE,
+        match, limit, offset,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            (game_id, rank, render_highlight(title), render_highlight(snippet))
+            for game_id, rank, title, snippet in cursor.fetchall()
+        ]
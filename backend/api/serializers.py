@@ -1,9 +1,13 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.db.models.manager import BaseManager
 from .models import *
-from django.utils import timezone
+from .ownership import OwnershipResolver
+from .counters import download_counter, topic_view_tracker
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для пользователя"""
@@ -66,45 +70,181 @@ class GameImageSerializer(serializers.ModelSerializer):
         model = GameImage
         fields = ['id', 'image', 'order']
 
-class GameSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Поддержка ?fields=a,b (только эти поля) и ?expand=x,y (необязательные поля)
+    
+    Выбор передается через context['sparse_fields'] = (fields, expand),
+    поле id остается всегда.
+    """
+    expandable_fields = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested, expand = self.context.get('sparse_fields') or (set(), set())
+        for name in expand:
+            if name in self.expandable_fields and name not in self.fields:
+                self.fields[name] = self.expandable_fields[name]()
+        if requested:
+            for name in set(self.fields) - set(requested) - {'id'}:
+                self.fields.pop(name)
+    
+    @staticmethod
+    def parse_field_selection(query_params):
+        def names(param):
+            return {
+                name.strip()
+                for value in query_params.getlist(param)
+                for name in value.split(',')
+                if name.strip()
+            }
+        return names('fields'), names('expand')
+    
+    def get_only_columns(self):
+        """Колонки модели для .only(), нужные выбранным полям"""
+        model = self.Meta.model
+        column_map = getattr(self.Meta, 'only_columns', {})
+        columns = {'id'}
+        for name, field in self.fields.items():
+            if name in column_map:
+                columns.update(column_map[name])
+                continue
+            source = field.source.split('.')[0]
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(model_field.name)
+        return columns
+
+class PendingDownloadsMixin:
+    """Добавляет к downloads еще не сброшенные в БД скачивания этого процесса"""
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'downloads' in data:
+            data['downloads'] += download_counter.pending(instance.pk)
+        return data
+
+class OwnershipListSerializer(serializers.ListSerializer):
+    """Список, который заранее загружает флаги владения для всей страницы"""
+    game_id_attr = 'pk'
+    
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        OwnershipResolver.for_context(self.context).prime(
+            getattr(item, self.game_id_attr) for item in items
+        )
+        return super().to_representation(items)
+
+class PurchaseListSerializer(OwnershipListSerializer):
+    game_id_attr = 'game_id'
+
+class DeveloperSummarySerializer(serializers.ModelSerializer):
+    """Публичные данные разработчика для карточек каталога"""
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
+class GameListSerializer(PendingDownloadsMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """Облегченный сериализатор карточки игры для списков"""
+    developer = DeveloperSummarySerializer(read_only=True)
+    is_owned = serializers.SerializerMethodField()
+    is_rented = serializers.SerializerMethodField()
+    
+    expandable_fields = {
+        'description': lambda: serializers.CharField(read_only=True),
+        'tags': lambda: serializers.CharField(read_only=True),
+        'images': lambda: GameImageSerializer(many=True, read_only=True),
+        'version': lambda: serializers.CharField(read_only=True),
+        'published_at': lambda: serializers.DateTimeField(read_only=True),
+    }
+    
+    class Meta:
+        model = Game
+        fields = [
+            'id', 'title', 'short_description', 'cover_image', 'genre',
+            'price', 'is_free', 'rental_price', 'average_rating', 'downloads',
+            'developer', 'is_owned', 'is_rented',
+        ]
+        read_only_fields = fields
+        list_serializer_class = OwnershipListSerializer
+        only_columns = {
+            'developer': ('developer__id', 'developer__username'),
+            'is_owned': (),
+            'is_rented': (),
+        }
+    
+    def get_is_owned(self, obj):
+        return OwnershipResolver.for_context(self.context).is_owned(obj.pk)
+    
+    def get_is_rented(self, obj):
+        return OwnershipResolver.for_context(self.context).is_rented(obj.pk)
+
+class GameSerializer(PendingDownloadsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для игр"""
     developer = UserSerializer(read_only=True)
     is_owned = serializers.SerializerMethodField()
     is_rented = serializers.SerializerMethodField()
     images = GameImageSerializer(many=True, read_only=True)  # Теперь GameImageSerializer определен выше
+    rating_histogram = serializers.SerializerMethodField()
+    # Файлы игры только загружаются: прямых ссылок нет, скачивание — через download
+    download_url = serializers.SerializerMethodField()
+    demo_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Game
-        fields = '__all__'
+        exclude = ['tag_set', *Game.rating_fields]
         read_only_fields = ['developer', 'downloads', 'average_rating', 'total_ratings']
+        extra_kwargs = {
+            'game_file': {'write_only': True},
+            'demo_file': {'write_only': True},
+        }
+        list_serializer_class = OwnershipListSerializer
+        only_columns = {
+            'developer': ('developer',),
+            'is_owned': (),
+            'is_rented': (),
+            'rating_histogram': Game.rating_fields,
+            'download_url': ('game_file',),
+            'demo_url': ('demo_file',),
+        }
+    
+    def get_rating_histogram(self, obj):
+        return obj.rating_histogram()
+    
+    def get_download_url(self, obj):
+        if not obj.game_file:
+            return None
+        return reverse('game-download', args=[obj.pk], request=self.context.get('request'))
+    
+    def get_demo_url(self, obj):
+        if not obj.demo_file:
+            return None
+        url = reverse('game-download', args=[obj.pk], request=self.context.get('request'))
+        return f'{url}?demo=1'
     
     def get_is_owned(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Purchase.objects.filter(
-                user=request.user, 
-                game=obj, 
-                purchase_type='purchase'
-            ).exists()
-        return False
+        return OwnershipResolver.for_context(self.context).is_owned(obj.pk)
     
     def get_is_rented(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            purchase = Purchase.objects.filter(
-                user=request.user, 
-                game=obj, 
-                purchase_type='rental'
-            ).first()
-            if purchase and purchase.rental_expires:
-                return purchase.rental_expires > timezone.now()
-        return False
+        return OwnershipResolver.for_context(self.context).is_rented(obj.pk)
     
     def create(self, validated_data):
         # При создании игры автоматически устанавливаем разработчика
         validated_data['developer'] = self.context['request'].user
         return super().create(validated_data)
 
+class CatalogStatsSerializer(serializers.ModelSerializer):
+    """Сериализатор для сводной статистики"""
+    average_rating = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = CatalogStats
+        fields = [
+            'games', 'published_games', 'users', 'developers', 'purchases',
+            'total_downloads', 'average_rating', 'rating_count', 'updated_at',
+        ]
+
 class PurchaseSerializer(serializers.ModelSerializer):
     """Сериализатор для покупок"""
     user = UserSerializer(read_only=True)
@@ -113,7 +253,8 @@ class PurchaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Purchase
         fields = '__all__'
-        read_only_fields = ['user', 'amount', 'created_at']
+        read_only_fields = ['user', 'developer', 'amount', 'rental_expires', 'expired', 'created_at']
+        list_serializer_class = PurchaseListSerializer
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
@@ -130,39 +271,41 @@ class ReviewSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        review = super().create(validated_data)
-        
-        # Обновляем рейтинг игры
-        review.game.update_rating(review.rating)
-        return review
+        # Рейтинг игры обновляет сигнал post_save (api.signals)
+        return super().create(validated_data)
 
 class ForumCategorySerializer(serializers.ModelSerializer):
     """Сериализатор для категорий форума"""
-    topic_count = serializers.IntegerField(source='topics.count', read_only=True)
     
     class Meta:
         model = ForumCategory
         fields = '__all__'
+        read_only_fields = ForumCategory.aggregate_fields
 
 class ForumTopicSerializer(serializers.ModelSerializer):
     """Сериализатор для тем форума"""
     author = UserSerializer(read_only=True)
-    post_count = serializers.IntegerField(source='posts.count', read_only=True)
     last_post = serializers.SerializerMethodField()
     
     class Meta:
         model = ForumTopic
         fields = '__all__'
-        read_only_fields = ['author', 'views', 'created_at', 'updated_at']
+        read_only_fields = ['author', 'created_at', 'updated_at', *ForumTopic.aggregate_fields]
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'views' in data:
+            data['views'] += topic_view_tracker.pending(instance.pk)
+        return data
     
     def get_last_post(self, obj):
-        last_post = obj.posts.last()
-        if last_post:
-            return {
-                'author': last_post.author.username,
-                'created_at': last_post.created_at
-            }
-        return None
+        # Денормализовано в теме: список тем не делает запросов на каждую строку
+        if obj.last_post_at is None:
+            return None
+        return {
+            'author': obj.last_post_author.username if obj.last_post_author else None,
+            'created_at': obj.last_post_at
+        }
     
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
@@ -177,4 +320,10 @@ class ForumPostSerializer(serializers.ModelSerializer):
         fields = ['id', 'topic', 'author', 'content', 'created_at', 'updated_at']
         read_only_fields = ['author', 'created_at', 'updated_at']
     
+    def validate_topic(self, value):
+        # Счетчики и ETag сообщений ведутся по теме: перенос их бы рассогласовал
+        if self.instance is not None and value.pk != self.instance.topic_id:
+            raise serializers.ValidationError('Сообщение нельзя перенести в другую тему')
+        return value
+    
     # Убираем метод create, так как author передается через save() в view
\ No newline at end of file
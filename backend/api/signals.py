@@ -0,0 +1,222 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache as catalog_cache
+from . import forum
+from . import ownership
+from . import ratings
+from . import search
+from . import stats
+from .models import ForumCategory, ForumPost, ForumTopic, Game, GameImage, Purchase, Review, User
+
+
+@receiver(post_save, sender=Game)
+def index_game_for_search(sender, instance, raw=False, **kwargs):
+    """Держит FTS-индекс в актуальном состоянии при сохранении игры"""
+    if raw:
+        return
+    search.index_game(instance)
+
+
+@receiver(post_save, sender=Game)
+def sync_game_tags(sender, instance, raw=False, **kwargs):
+    """Разбирает строку тегов в нормализованный индекс Tag"""
+    if raw:
+        return
+    instance.sync_tags()
+
+
+@receiver(post_delete, sender=Game)
+def remove_game_from_search(sender, instance, **kwargs):
+    search.remove_game(instance.pk)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=GameImage)
+@receiver(post_delete, sender=GameImage)
+def invalidate_catalog_cache(sender, **kwargs):
+    catalog_cache.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_catalog_cache_for_developer(sender, instance, **kwargs):
+    """Разработчик вложен в ответ каталога, поэтому его изменения тоже сбрасывают кеш"""
+    if instance.role == 'developer':
+        catalog_cache.invalidate()
+
+
+def _deleted_with(origin, *models):
+    """Удаление запущено объектом или queryset одной из моделей (каскад от них)"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in models
+
+
+def _saved_values(instance, update_fields=None):
+    """Значения, которые оказались в БД: поля вне update_fields не записывались"""
+    stored = getattr(instance, '_stored_values', None)
+    if update_fields is not None:
+        # update_fields содержит имена полей ('category'), tracked_fields — attname ('category_id')
+        update_fields = {instance._meta.get_field(name).attname for name in update_fields}
+    return {
+        name: getattr(instance, name)
+        if update_fields is None or stored is None or name in update_fields
+        else stored[name]
+        for name in instance.tracked_fields
+    }
+
+
+@receiver(pre_save, sender=Game)
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=ForumTopic)
+@receiver(pre_delete, sender=Game)
+@receiver(pre_delete, sender=User)
+@receiver(pre_delete, sender=Review)
+@receiver(pre_delete, sender=ForumTopic)
+def load_stored_values(sender, instance, raw=False, **kwargs):
+    """Запоминает значения из БД до записи: объект в памяти может быть устаревшим"""
+    if raw or instance.pk is None:
+        return
+    instance._stored_values = sender.objects.filter(pk=instance.pk).values(
+        *sender.tracked_fields
+    ).first()
+
+
+@receiver(post_save, sender=Game)
+def update_stats_on_game_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = stats.game_contribution(getattr(instance, '_stored_values', None))
+    new = stats.game_contribution(_saved_values(instance, update_fields))
+    stats.apply_delta(**stats.difference(old, new))
+
+
+@receiver(post_delete, sender=Game)
+def update_stats_on_game_delete(sender, instance, **kwargs):
+    old = stats.game_contribution(getattr(instance, '_stored_values', None))
+    stats.apply_delta(**stats.negate(old))
+
+
+@receiver(post_save, sender=User)
+def update_stats_on_user_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = stats.user_contribution(getattr(instance, '_stored_values', None))
+    new = stats.user_contribution(_saved_values(instance, update_fields))
+    stats.apply_delta(**stats.difference(old, new))
+
+
+@receiver(post_delete, sender=User)
+def update_stats_on_user_delete(sender, instance, **kwargs):
+    old = stats.user_contribution(getattr(instance, '_stored_values', None))
+    stats.apply_delta(**stats.negate(old))
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_stored_values', None)
+    new = _saved_values(instance, update_fields)
+    if old and old['game_id'] != new['game_id']:
+        ratings.apply_review_delta(old['game_id'], removed=old['rating'])
+        old = None
+    ratings.apply_review_delta(
+        new['game_id'], added=new['rating'], removed=old and old['rating']
+    )
+
+
+@receiver(pre_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, origin=None, **kwargs):
+    """Снимает оценку до удаления (в той же транзакции)
+
+    При каскаде pre_delete отзывов приходит раньше, чем pre_delete игры,
+    поэтому снимок игры для сводной статистики уже учитывает снятые оценки.
+    """
+    # Удаляется сама игра: её вклад целиком снимет update_stats_on_game_delete
+    if _deleted_with(origin, Game):
+        return
+    old = getattr(instance, '_stored_values', None)
+    if old:
+        ratings.apply_review_delta(old['game_id'], removed=old['rating'])
+
+
+@receiver(post_save, sender=Purchase)
+def update_stats_on_purchase_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.apply_delta(purchases=1)
+
+
+@receiver(post_delete, sender=Purchase)
+def update_stats_on_purchase_delete(sender, instance, **kwargs):
+    stats.apply_delta(purchases=-1)
+
+
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+def invalidate_ownership(sender, instance, **kwargs):
+    """Сбрасывает кеш прав покупателя; повторно после коммита, чтобы параллельный
+    запрос не закешировал данные до фиксации транзакции под новой версией"""
+    ownership.bump_version(instance.user_id)
+    transaction.on_commit(lambda: ownership.bump_version(instance.user_id))
+
+
+@receiver(post_save, sender=ForumTopic)
+@receiver(post_delete, sender=ForumTopic)
+@receiver(post_save, sender=ForumPost)
+@receiver(post_delete, sender=ForumPost)
+def invalidate_topic_list(sender, **kwargs):
+    """Тема и ее последнее сообщение видны в списке тем"""
+    forum.topics_changed()
+
+
+@receiver(post_save, sender=ForumPost)
+def update_topic_on_post_save(sender, instance, created, raw=False, **kwargs):
+    """Счетчики и последнее сообщение темы, событие для SSE; updated_at темы нужен для ETag"""
+    if raw:
+        return
+    if created:
+        forum.post_added(instance)
+        # Подписчики SSE увидят сообщение только после фиксации транзакции
+        transaction.on_commit(lambda: forum.publish_post(instance))
+    else:
+        ForumTopic.objects.filter(pk=instance.topic_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=ForumPost)
+def update_counters_on_post_delete(sender, instance, origin=None, **kwargs):
+    """Снимает сообщение со счетчиков до удаления, как и оценки отзывов
+    
+    При каскаде от пользователя снимок темы для update_counters_on_topic_delete
+    берется уже после этого и не учитывает сообщение дважды.
+    """
+    # Удаляется тема или категория целиком: их счетчики снимутся разом
+    if not _deleted_with(origin, ForumTopic, ForumCategory):
+        forum.post_removed(instance)
+
+
+@receiver(post_delete, sender=ForumPost)
+def refresh_last_post_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, ForumTopic, ForumCategory):
+        forum.refresh_last_post(instance.topic_id)
+
+
+@receiver(post_save, sender=ForumTopic)
+def update_counters_on_topic_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    forum.topic_saved(
+        getattr(instance, '_stored_values', None), _saved_values(instance, update_fields)
+    )
+
+
+@receiver(post_delete, sender=ForumTopic)
+def update_counters_on_topic_delete(sender, instance, origin=None, **kwargs):
+    stored = getattr(instance, '_stored_values', None)
+    if stored and not _deleted_with(origin, ForumCategory):
+        forum.topic_removed(stored)
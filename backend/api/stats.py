@@ -0,0 +1,82 @@
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import CatalogStats, Game, Purchase, User
+
+STATS_PK = 1
+COUNTER_FIELDS = (
+    'games', 'published_games', 'users', 'developers', 'purchases',
+    'total_downloads', 'rating_total', 'rating_count',
+)
+
+
+def load():
+    """Единственная строка статистики; при отсутствии пересчитывается с нуля"""
+    stats = CatalogStats.objects.filter(pk=STATS_PK).first()
+    return stats or recompute()
+
+
+def apply_delta(**deltas):
+    """Атомарно прибавляет приращения к счетчикам: UPDATE ... SET x = x + d"""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    updated = CatalogStats.objects.filter(pk=STATS_PK).update(
+        **{name: F(name) + value for name, value in deltas.items()}
+    )
+    if not updated:
+        recompute()
+
+
+def recompute():
+    """Пересчитывает статистику полностью (команда recompute_stats)"""
+    published = Q(status='published')
+    games = Game.objects.aggregate(
+        games=Count('pk'),
+        published_games=Count('pk', filter=published),
+        total_downloads=Coalesce(Sum('downloads', filter=published), 0),
+        rating_total=Coalesce(
+            Sum(F('average_rating') * F('total_ratings'), filter=published, output_field=FloatField()),
+            0.0,
+        ),
+        rating_count=Coalesce(Sum('total_ratings', filter=published), 0),
+    )
+    users = User.objects.aggregate(
+        users=Count('pk'),
+        developers=Count('pk', filter=Q(role='developer')),
+    )
+    stats, _ = CatalogStats.objects.update_or_create(
+        pk=STATS_PK,
+        defaults={**games, **users, 'purchases': Purchase.objects.count()},
+    )
+    return stats
+
+
+def game_contribution(values):
+    """Вклад одной игры в счетчики по значениям её отслеживаемых полей"""
+    if not values:
+        return {}
+    contribution = {'games': 1}
+    if values['status'] == 'published':
+        contribution.update(
+            published_games=1,
+            total_downloads=values['downloads'],
+            rating_total=values['average_rating'] * values['total_ratings'],
+            rating_count=values['total_ratings'],
+        )
+    return contribution
+
+
+def user_contribution(values):
+    if not values:
+        return {}
+    return {'users': 1, 'developers': int(values['role'] == 'developer')}
+
+
+def difference(old, new):
+    names = set(old) | set(new)
+    return {name: new.get(name, 0) - old.get(name, 0) for name in names}
+
+
+def negate(contribution):
+    return {name: -value for name, value in contribution.items()}
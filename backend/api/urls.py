@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
+from . import views_events
 from . import views_navigator
 
 router = DefaultRouter()
@@ -14,7 +15,9 @@ router.register(r'forum/posts', views.ForumPostViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('forum/topics/<int:pk>/events/', views_events.topic_events, name='topic_events'),
     path('navigator/', views_navigator.api_navigator, name='api_navigator'),
+    path('stats/', views.StatsView.as_view(), name='stats'),
     # ЭТОТ URL ОЧЕНЬ ВАЖЕН:
     path('users/login/', views.LoginView.as_view(), name='user_login'),
 ]
\ No newline at end of file
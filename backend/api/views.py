@@ -1,14 +1,31 @@
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count
+from rest_framework.generics import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.db.models import Q, Count, Value, prefetch_related_objects
 from django.utils import timezone
 from .models import *
 from .serializers import *
 from .permissions import *
+from .pagination import (
+    ForumPostPagination, ForumTopicPagination, GameCursorPagination, ReviewFeedPagination,
+)
+from .search import search_games
+from .ownership import OwnershipResolver
+from . import forum
+from . import ownership
+from .conditional import ConditionalGetMixin
+from .downloads import is_resumed, serve_file
+from .counters import download_counter, topic_view_tracker
+from .checkout import CheckoutError, purchase_game, purchase_games
+from .rentals import active_rentals
+from . import cache as catalog_cache
+from . import stats
+from . import exports
+from .sales import MAX_SERIES_DAYS, sales_series
 
 class UserViewSet(viewsets.ModelViewSet):
     """ViewSet для пользователей"""
@@ -42,23 +59,112 @@ class UserViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class GameViewSet(viewsets.ModelViewSet):
+class GameViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для игр"""
     queryset = Game.objects.all()
     serializer_class = GameSerializer
+    pagination_class = GameCursorPagination
+    # Действия, поддерживающие ?fields= и ?expand=
+    sparse_actions = ['list', 'retrieve', 'search', 'similar']
     
     def get_queryset(self):
+        if self.action in self.sparse_actions:
+            queryset = self.prune_columns(Game.objects.all())
+        else:
+            queryset = Game.objects.select_related('developer').prefetch_related('images')
         if self.action == 'list':
-            return Game.objects.filter(status='published')
-        return Game.objects.all()
+            return self.filter_catalog(queryset.filter(status='published'))
+        return queryset
+    
+    def get_serializer_class(self):
+        if self.action in ['list', 'search', 'similar']:
+            return GameListSerializer
+        return GameSerializer
+    
+    def prune_columns(self, queryset):
+        """Загружает только колонки, нужные выбранным через ?fields=/?expand= полям"""
+        serializer = self.get_serializer()
+        columns = serializer.get_only_columns()
+        if self.action == 'list':
+            columns.update(name.lstrip('-') for name in self.paginator.ordering)
+        if 'developer' in serializer.fields:
+            queryset = queryset.select_related('developer')
+        if 'images' in serializer.fields:
+            queryset = queryset.prefetch_related('images')
+        return queryset.only(*columns)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.sparse_actions:
+            context['sparse_fields'] = SparseFieldsMixin.parse_field_selection(
+                self.request.query_params
+            )
+        if getattr(self, 'render_for_cache', False):
+            # В кеш попадает ответ без персональных полей: они добавляются после
+            context[OwnershipResolver.context_key] = OwnershipResolver()
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or self.cached_response(
+            'list', lambda: mixins.ListModelMixin.list(self, request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.not_modified_response(request) or self.cached_response(
+            'detail', lambda: mixins.RetrieveModelMixin.retrieve(self, request, *args, **kwargs)
+        )
+    
+    def get_validator_version(self, request):
+        # Версия каталога меняется при записи игр, изображений и разработчиков;
+        # агрегат по всем опубликованным играм на каждый запрос не нужен
+        return [catalog_cache.get_version(), ownership.get_version(request.user)]
+    
+    def cached_response(self, kind, render):
+        """Общий для всех пользователей ответ из кеша + is_owned/is_rented текущего пользователя"""
+        key = catalog_cache.make_key(kind, self.request)
+        payload = catalog_cache.get_payload(key)
+        cache_status = 'HIT'
+        if payload is None:
+            self.render_for_cache = True
+            response = render()
+            self.render_for_cache = False
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            payload = response.data
+            catalog_cache.set_payload(key, payload)
+            cache_status = 'MISS'
+        
+        items = payload['results'] if kind == 'list' else [payload]
+        resolver = OwnershipResolver(self.request.user)
+        resolver.prime(item['id'] for item in items)
+        for item in items:
+            if 'is_owned' in item:
+                item['is_owned'] = resolver.is_owned(item['id'])
+            if 'is_rented' in item:
+                item['is_rented'] = resolver.is_rented(item['id'])
+        return Response(payload, headers={'X-Cache': cache_status})
+    
+    def filter_catalog(self, queryset):
+        """Фильтры каталога ?tag=a&tag=b&genre=... через индекс тегов"""
+        params = self.request.query_params
+        for name in Tag.parse(','.join(params.getlist('tag'))):
+            queryset = queryset.filter(tag_set__name=name)
+        genre = params.get('genre')
+        if genre:
+            queryset = queryset.filter(genre=genre)
+        return queryset
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'search', 'facets', 'download', 'reviews', 'similar']:
             return [AllowAny()]
         elif self.action == 'create':
             return [IsDeveloper()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             return [IsOwnerOrReadOnly()]
+        elif self.action == 'cache_stats':
+            return [IsAdmin()]
+        elif self.action == 'sales':
+            return [IsDeveloper()]
         return [IsAuthenticated()]
     
     def perform_create(self, serializer):
@@ -66,10 +172,153 @@ class GameViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[IsDeveloper])
     def my_games(self, request):
-        games = Game.objects.filter(developer=request.user)
+        games = self.get_queryset().filter(developer=request.user)
         serializer = self.get_serializer(games, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Скачивание игры (или демо при ?demo=1) с проверкой прав и поддержкой Range"""
+        game = get_object_or_404(Game, pk=pk)
+        demo = request.query_params.get('demo') in ('1', 'true')
+        file = game.demo_file if demo else game.game_file
+        
+        if game.status != 'published' and game.developer_id != request.user.pk:
+            return Response({'error': 'Игра недоступна'}, status=status.HTTP_404_NOT_FOUND)
+        if not file:
+            return Response({'error': 'Файл не загружен'}, status=status.HTTP_404_NOT_FOUND)
+        if not demo and not self.can_download(request.user, game):
+            return Response(
+                {'error': 'Игра не куплена или срок аренды истек'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        response = serve_file(request, file)
+        
+        # Докачка (Range не с начала файла) не считается новым скачиванием
+        if not demo and request.method == 'GET' and response.status_code in (200, 206) \
+                and not is_resumed(request, response):
+            download_counter.increment(game.pk)
+        return response
+    
+    def can_download(self, user, game):
+        if game.is_free or game.developer_id == user.pk:
+            return True
+        return ownership.can_access(user, game.pk)
+    
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, pk=None):
+        """Лента отзывов игры: сводка по оценкам и первая страница за один запрос"""
+        game = get_object_or_404(
+            Game.objects.only('id', 'average_rating', 'total_ratings', *Game.rating_fields),
+            pk=pk,
+        )
+        reviews = Review.objects.filter(game=game).select_related('user')
+        paginator = ReviewFeedPagination()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = ReviewSerializer(page, many=True, context=self.get_serializer_context())
+        
+        paginator.count = game.total_ratings
+        response = paginator.get_paginated_response(serializer.data)
+        summary = {
+            'total': game.total_ratings,
+            'average_rating': game.average_rating,
+            'histogram': game.rating_histogram(),
+        }
+        response.data = {'summary': summary, **response.data}
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """С этой игрой покупают: готовый top-K из GameSimilarity одним запросом"""
+        if not pk.isdigit():
+            raise Http404
+        neighbours = list(
+            GameSimilarity.objects.filter(game_id=pk, similar_game__status='published')
+            .select_related('similar_game__developer')
+            .order_by('rank')
+        )
+        serializer = self.get_serializer(
+            [neighbour.similar_game for neighbour in neighbours], many=True
+        )
+        results = []
+        for data, neighbour in zip(serializer.data, neighbours):
+            data['similarity'] = {
+                'score': neighbour.score,
+                'common_buyers': neighbour.common_buyers,
+            }
+            results.append(data)
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def sales(self, request):
+        """Дневные продажи игр разработчика: ?days=90 (до 366), ?game=<id>"""
+        try:
+            days = int(request.query_params.get('days', 90))
+            game_id = request.query_params.get('game')
+            game_id = int(game_id) if game_id else None
+        except ValueError:
+            return Response(
+                {'error': 'Параметры days и game должны быть числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        days = min(max(days, 1), MAX_SERIES_DAYS)
+        return Response(sales_series(request.user, days, game_id))
+    
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Счетчики попаданий и промахов кеша каталога"""
+        return Response(catalog_cache.get_stats())
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Количество опубликованных игр по тегам и жанрам для текущего фильтра"""
+        games = self.filter_catalog(Game.objects.filter(status='published')).values('pk')
+        tag_counts = Game.tag_set.through.objects.filter(
+            game__in=games
+        ).values('tag__name').annotate(
+            kind=Value('tag'), count=Count('game_id')
+        ).values_list('kind', 'tag__name', 'count').order_by()
+        genre_counts = Game.objects.filter(
+            pk__in=games
+        ).exclude(genre='').values('genre').annotate(
+            kind=Value('genre'), count=Count('pk')
+        ).values_list('kind', 'genre', 'count').order_by()
+        
+        facets = {'tags': [], 'genres': []}
+        for kind, name, count in tag_counts.union(genre_counts, all=True):
+            facets['tags' if kind == 'tag' else 'genres'].append({'name': name, 'count': count})
+        for values in facets.values():
+            values.sort(key=lambda item: (-item['count'], item['name']))
+        return Response(facets)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Полнотекстовый поиск по опубликованным играм (BM25)"""
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response(
+                {'error': 'limit и offset должны быть числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        hits = search_games(query, limit=limit, offset=offset)
+        games = self.get_queryset().order_by().in_bulk([hit[0] for hit in hits])
+        ranked = [(games[hit[0]], hit) for hit in hits if hit[0] in games]
+        
+        serializer = self.get_serializer([game for game, _ in ranked], many=True)
+        results = []
+        for data, (_, (_, rank, title, snippet)) in zip(serializer.data, ranked):
+            data['search'] = {
+                'rank': rank,
+                'title_highlight': title,
+                'snippet': snippet,
+            }
+            results.append(data)
+        return Response({'query': query, 'results': results})
+    
 @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
 def add_post(self, request, pk=None):
     """Добавление сообщения в тему"""
@@ -114,7 +363,9 @@ class PurchaseViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user).select_related(
+            'user', 'game', 'game__developer'
+        ).prefetch_related('game__images')
     
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def buy(self, request):
@@ -123,48 +374,91 @@ class PurchaseViewSet(viewsets.ModelViewSet):
         
         game = get_object_or_404(Game, id=game_id, status='published')
         
-        existing_purchase = Purchase.objects.filter(
-            user=request.user,
-            game=game,
-            purchase_type=purchase_type
-        ).exists()
-        
-        if existing_purchase:
+        try:
+            purchase = purchase_game(request.user, game, purchase_type)
+        except CheckoutError as error:
             return Response(
-                {'error': 'Игра уже приобретена'},
+                {'error': str(error)},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        amount = game.price if purchase_type == 'purchase' else game.rental_price
-        if request.user.balance < amount:
+        serializer = self.get_serializer(purchase)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def buy_many(self, request):
+        """Корзина: {"items": [{"game_id": 1, "type": "purchase"}, ...]}, все или ничего"""
+        items = request.data.get('items')
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
             return Response(
-                {'error': 'Недостаточно средств на балансе'},
+                {'error': 'Ожидается список items'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        purchase = Purchase.objects.create(
-            user=request.user,
-            game=game,
-            purchase_type=purchase_type,
-            amount=amount
-        )
+        try:
+            purchases = purchase_games(
+                request.user,
+                [(item.get('game_id'), item.get('type', 'purchase')) for item in items]
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Некорректный game_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except CheckoutError as error:
+            return Response(
+                {'error': str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        request.user.balance -= amount
-        request.user.save()
+        prefetch_related_objects(purchases, 'game__developer', 'game__images')
+        serializer = self.get_serializer(purchases, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsDeveloper])
+    def export(self, request):
+        """Потоковая выгрузка продаж разработчика: ?output=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD"""
+        output = request.query_params.get('output', 'csv')
+        if output not in exports.FORMATS:
+            return Response(
+                {'error': 'Поддерживаются форматы: ' + ', '.join(exports.FORMATS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        game.developer.balance += amount * 0.8
-        game.developer.save()
+        try:
+            rows = exports.sales_rows(
+                request.user,
+                request.query_params.get('from'),
+                request.query_params.get('to'),
+            )
+        except exports.ExportError as error:
+            return Response(
+                {'error': str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = self.get_serializer(purchase)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        render, content_type, extension = exports.FORMATS[output]
+        response = StreamingHttpResponse(render(rows), content_type=content_type)
+        filename = f'sales-{timezone.now():%Y%m%d}.{extension}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def active_rentals(self, request):
+        """Действующие аренды, ближайшие к окончанию первыми"""
+        rentals = active_rentals(request.user).select_related(
+            'user', 'game', 'game__developer'
+        ).prefetch_related('game__images')
+        serializer = self.get_serializer(rentals, many=True)
+        return Response(serializer.data)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для отзывов"""
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('user')
         game_id = self.request.query_params.get('game_id')
         if game_id:
             queryset = queryset.filter(game_id=game_id)
@@ -177,10 +471,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         game = serializer.validated_data['game']
-        has_purchase = Purchase.objects.filter(
-            user=self.request.user,
-            game=game
-        ).exists()
+        has_purchase = ownership.has_purchased(self.request.user, game.pk)
         
         if not has_purchase and not game.is_free:
             raise serializers.ValidationError(
@@ -195,10 +486,60 @@ class ForumCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ForumCategorySerializer
     permission_classes = [AllowAny]
 
-class ForumTopicViewSet(viewsets.ModelViewSet):
+class ForumTopicViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для тем форума"""
-    queryset = ForumTopic.objects.all()
+    queryset = ForumTopic.objects.select_related('author', 'last_post_author')
     serializer_class = ForumTopicSerializer
+    pagination_class = ForumTopicPagination
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return self.filter_topics(queryset)
+        return queryset
+    
+    def retrieve(self, request, *args, **kwargs):
+        # Просмотр засчитывается и при ответе 304: тему все равно открыли
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        if pk.isdigit():
+            topic_view_tracker.record(int(pk), self.viewer_key(request))
+        return super().retrieve(request, *args, **kwargs)
+    
+    def get_validator_version(self, request):
+        # Список тем без фильтра — вся таблица: ETag по версии, а не по агрегату
+        if self.action == 'list':
+            return [forum.get_topics_version()]
+        return None
+    
+    @staticmethod
+    def viewer_key(request):
+        """Ключ зрителя для скетча уникальных просмотров"""
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        meta = request.META
+        return f"anon:{meta.get('REMOTE_ADDR', '')}:{meta.get('HTTP_USER_AGENT', '')}"
+    
+    def filter_topics(self, queryset):
+        """?category=&author=&is_pinned=&is_closed=
+        
+        Фильтр по категории или автору вместе с сортировкой списка идет
+        по индексам (category|author, is_pinned, created_at).
+        """
+        params = self.request.query_params
+        for name in ('category', 'author'):
+            value = params.get(name)
+            if not value:
+                continue
+            if not value.isdigit():
+                raise serializers.ValidationError({name: 'Ожидается числовой идентификатор'})
+            queryset = queryset.filter(**{f'{name}_id': int(value)})
+        for name in ('is_pinned', 'is_closed'):
+            value = params.get(name, '').lower()
+            if value in ('1', 'true'):
+                queryset = queryset.filter(**{name: True})
+            elif value in ('0', 'false'):
+                queryset = queryset.filter(**{name: False})
+        return queryset
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'posts']:
@@ -207,11 +548,25 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def posts(self, request, pk=None):
-        """Получение сообщений темы"""
-        topic = self.get_object()
-        posts = topic.posts.all()
-        serializer = ForumPostSerializer(posts, many=True)
-        return Response(serializer.data)
+        """Сообщения темы страницами; ?after=<last> — только появившиеся после курсора
+        
+        Любое изменение сообщений трогает updated_at темы, поэтому ETag
+        считается по одной строке темы, а не по всем ее сообщениям.
+        """
+        if not pk.isdigit():
+            raise Http404
+        topics = ForumTopic.objects.filter(pk=pk)
+        not_modified = self.not_modified_response(request, topics)
+        if not_modified:
+            return not_modified
+        topic = get_object_or_404(topics.only('id', 'post_count'))
+        posts = ForumPost.objects.filter(topic=topic).select_related('author')
+        paginator = ForumPostPagination()
+        page = paginator.paginate_queryset(posts, request, view=self)
+        serializer = ForumPostSerializer(page, many=True)
+        
+        paginator.count = topic.post_count
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_post(self, request, pk=None):
@@ -239,12 +594,21 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
             print("Serializer errors:", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ForumPostViewSet(viewsets.ModelViewSet):
+class ForumPostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet для сообщений форума"""
     queryset = ForumPost.objects.all()
     serializer_class = ForumPostSerializer
     permission_classes = [IsAuthorOrReadOnly]
 
+class StatsView(generics.GenericAPIView):
+    """Сводная статистика платформы (одна строка, без агрегаций на лету)"""
+    serializer_class = CatalogStatsSerializer
+    permission_classes = [AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(stats.load())
+        return Response(serializer.data)
+
 class LoginView(generics.GenericAPIView):
     """View для входа пользователя"""
     serializer_class = LoginSerializer
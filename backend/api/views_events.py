@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import forum
+from .events import hub
+from .models import ForumTopic
+
+
+def format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def topic_stream(topic_id, after=None):
+    """Поток SSE: пропущенные сообщения из БД, затем новые из hub
+
+    Подписка оформляется до чтения из БД, поэтому сообщение, созданное
+    между ними, не теряется; повтор отсеивается по id.
+    """
+    with hub.subscribe(forum.topic_channel(topic_id)) as subscription:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        replayed = set()
+        if after:
+            async for post in forum.posts_after(topic_id, after):
+                replayed.add(post.pk)
+                yield format_event(forum.post_event(post))
+        while True:
+            try:
+                event = await subscription.get(settings.EVENTS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                # Комментарий не дает прокси закрыть простаивающее соединение
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                # Клиент не успевал читать: переподключится с Last-Event-ID
+                return
+            if event['data']['id'] in replayed:
+                continue
+            yield format_event(event)
+
+
+@require_GET
+async def topic_events(request, pk):
+    """SSE: новые сообщения темы по мере публикации
+
+    Асинхронный view: под ASGI (core.asgi) тысячи ждущих клиентов держит
+    один цикл событий, а не поток на каждого. Переподключение с
+    Last-Event-ID (или ?after=<last> из ленты сообщений) сначала досылает
+    пропущенное.
+    """
+    if not await ForumTopic.objects.filter(pk=pk).aexists():
+        raise Http404
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI бесконечный поток навсегда занял бы воркер;
+        # на 204 EventSource перестает переподключаться
+        return HttpResponse(status=204)
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    response = StreamingHttpResponse(topic_stream(pk, after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
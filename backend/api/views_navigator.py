@@ -1,18 +1,19 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from .models import Game, User, Purchase
+from . import stats
 
 def api_navigator(request):
     """View для страницы навигации по API"""
     
-    # Получаем статистику для отображения
+    # Статистика хранится одной строкой и поддерживается сигналами
+    catalog = stats.load()
     context = {
-        'total_games': Game.objects.count(),
-        'total_users': User.objects.count(),
-        'total_purchases': Purchase.objects.count(),
-        'published_games': Game.objects.filter(status='published').count(),
-        'developers': User.objects.filter(role='developer').count(),
+        'total_games': catalog.games,
+        'total_users': catalog.users,
+        'total_purchases': catalog.purchases,
+        'published_games': catalog.published_games,
+        'developers': catalog.developers,
         'server_time': timezone.now(),
     }
     
@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
+# Асинхронные view (поток SSE форума, api.views_events) держат соединения
+# без выделенного потока только под ASGI-сервером, например:
+# uvicorn core.asgi:application
 application = get_asgi_application()
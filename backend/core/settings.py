@@ -124,6 +124,22 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Файлы игр лежат вне MEDIA_ROOT и не раздаются по /media/:
+# скачать их можно только через /api/games/<id>/download/
+PROTECTED_MEDIA_ROOT = BASE_DIR / 'protected_media'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'protected': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': PROTECTED_MEDIA_ROOT},
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -137,6 +153,68 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Кеш. LocMem живет в памяти одного процесса: при нескольких воркерах
+# gunicorn укажите общий бэкенд (Redis, Memcached), чтобы версия каталога
+# и счетчики были едины для всех воркеров
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'game-platform',
+    }
+}
+
+# Каталог игр: keyset-пагинация
+CATALOG_PAGE_SIZE = 20
+CATALOG_MAX_PAGE_SIZE = 100
+# Сколько секунд кешируется общее количество игр для пагинации
+CATALOG_COUNT_CACHE_TIMEOUT = 60
+# Сколько секунд хранится сериализованный ответ каталога (сброс — по версии)
+CATALOG_CACHE_TIMEOUT = 300
+
+# Кеш прав пользователя (купленные и арендованные игры); сбрасывается при покупке.
+# Кеш отвечает только «да»: отказ при скачивании и отзыве перепроверяется в БД
+ENTITLEMENTS_CACHE_TIMEOUT = 3600
+
+# Отдача файлов игр через фронт-прокси: None (стримит Django),
+# 'x-accel-redirect' (nginx) или 'x-sendfile' (apache/lighttpd).
+# Для nginx DOWNLOAD_ACCEL_PREFIX должен указывать на internal location с PROTECTED_MEDIA_ROOT
+DOWNLOAD_ACCEL = os.environ.get('DOWNLOAD_ACCEL') or None
+DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+
+# Счетчик скачиваний копится в памяти воркера и сбрасывается пачками:
+# раз в N секунд или после M скачиваний (и при завершении процесса)
+DOWNLOAD_COUNTER_FLUSH_INTERVAL = 10
+DOWNLOAD_COUNTER_FLUSH_THRESHOLD = 100
+
+# Просмотры тем форума копятся так же: счетчик views и HyperLogLog-скетч
+# уникальных зрителей сбрасываются в БД раз в N секунд или после M просмотров
+TOPIC_VIEW_FLUSH_INTERVAL = 10
+TOPIC_VIEW_FLUSH_THRESHOLD = 100
+
+# Срок аренды, если разработчик не указал rental_days, и размер пачки
+# для команды expire_rentals
+DEFAULT_RENTAL_DAYS = 7
+RENTAL_EXPIRY_BATCH_SIZE = 1000
+
+# Похожие игры (build_similar_games): сколько соседей хранить, минимум общих
+# покупателей и предел размера библиотеки одного пользователя (большие
+# коллекции дают квадратичное число пар и мало говорят о сходстве)
+SIMILAR_GAMES_TOP_K = 10
+SIMILAR_GAMES_MIN_COMMON = 1
+SIMILAR_GAMES_MAX_BASKET = 500
+
+# Живые события форума (SSE). LocalBackend доставляет события только своему
+# процессу; при нескольких воркерах укажите api.events.RedisBackend
+# (EVENTS_BACKEND_OPTIONS = {'url': 'redis://...'}). Подписчику, который не
+# успевает читать и накопил EVENTS_QUEUE_SIZE событий, поток закрывается
+EVENTS_BACKEND = 'api.events.LocalBackend'
+EVENTS_BACKEND_OPTIONS = {}
+EVENTS_QUEUE_SIZE = 100
+# Раз в N секунд простаивающему потоку отправляется комментарий keep-alive;
+# EVENTS_RETRY_MS — пауза браузера перед переподключением
+EVENTS_HEARTBEAT_INTERVAL = 15
+EVENTS_RETRY_MS = 3000
+
 # JWT настройки
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -11,6 +11,7 @@ const DeveloperDashboard = () => {
   const [games, setGames] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [sales, setSales] = useState(null);
   const [stats, setStats] = useState({
     totalGames: 0,
     totalDownloads: 0,
@@ -83,6 +84,23 @@ const DeveloperDashboard = () => {
     }
   };
 
+  // Продажи за 90 дней из дневных агрегатов
+  useEffect(() => {
+    if (activeTab === 'analytics' && isAuthenticated && !sales) {
+      fetchSales();
+    }
+  }, [activeTab, isAuthenticated]);
+
+  const fetchSales = async () => {
+    try {
+      const response = await apiClient.get('/games/sales/', { params: { days: 90 } });
+      setSales(response.data);
+    } catch (err) {
+      console.error('Ошибка загрузки продаж:', err);
+      setSales({ games: [] });
+    }
+  };
+
   const handleDeleteGame = async (gameId) => {
     if (!window.confirm('Вы уверены, что хотите удалить игру? Это действие нельзя отменить.')) {
       return;
@@ -377,15 +395,47 @@ const DeveloperDashboard = () => {
               )}
 
               {activeTab === 'analytics' && (
-                <div className="text-center py-12">
-                  <div className="text-6xl mb-4">📊</div>
-                  <h3 className="text-lg font-semibold text-gray-900 mb-2">
-                    Аналитика скоро появится
-                  </h3>
-                  <p className="text-gray-600">
-                    Здесь будут графики и статистика по вашим играм
-                  </p>
-                </div>
+                sales && sales.games.length > 0 ? (
+                  <div>
+                    <h3 className="text-lg font-semibold text-gray-900 mb-4">
+                      Продажи за {sales.days} дней
+                    </h3>
+                    <table className="w-full text-sm">
+                      <thead>
+                        <tr className="text-left text-gray-600 border-b">
+                          <th className="py-2">Игра</th>
+                          <th className="py-2">Продано</th>
+                          <th className="py-2">Выручка</th>
+                          <th className="py-2">Последняя продажа</th>
+                        </tr>
+                      </thead>
+                      <tbody>
+                        {sales.games.map((game) => (
+                          <tr key={game.game_id} className="border-b">
+                            <td className="py-2">
+                              <Link to={`/game/${game.game_id}`} className="text-primary hover:underline">
+                                {game.title}
+                              </Link>
+                            </td>
+                            <td className="py-2">{game.units}</td>
+                            <td className="py-2">{Number(game.revenue).toFixed(2)} ₽</td>
+                            <td className="py-2">{game.series[game.series.length - 1].day}</td>
+                          </tr>
+                        ))}
+                      </tbody>
+                    </table>
+                  </div>
+                ) : (
+                  <div className="text-center py-12">
+                    <div className="text-6xl mb-4">📊</div>
+                    <h3 className="text-lg font-semibold text-gray-900 mb-2">
+                      {sales ? 'Продаж пока нет' : 'Загрузка...'}
+                    </h3>
+                    <p className="text-gray-600">
+                      Здесь появится статистика продаж ваших игр за 90 дней
+                    </p>
+                  </div>
+                )
               )}
 
               {activeTab === 'earnings' && (
@@ -10,6 +10,7 @@ const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 const ForumPage = () => {
   const [categories, setCategories] = useState([]);
   const [topics, setTopics] = useState([]);
+  const [topicsNext, setTopicsNext] = useState(null);
   const [selectedCategory, setSelectedCategory] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -39,16 +40,18 @@ const ForumPage = () => {
     }
   };
 
-  const fetchTopics = async (categoryId = null) => {
+  // Темы приходят страницами; next — курсор следующей страницы
+  const fetchTopics = async (categoryId = null, next = null) => {
     try {
-      setLoading(true);
-      const url = categoryId 
+      if (!next) setLoading(true);
+      const url = next || (categoryId 
         ? `${API_URL}/forum/topics/?category=${categoryId}`
-        : `${API_URL}/forum/topics/`;
+        : `${API_URL}/forum/topics/`);
       const response = await axios.get(url, {
         headers: getAuthHeaders()
       });
-      setTopics(response.data);
+      setTopics((prev) => (next ? [...prev, ...response.data.results] : response.data.results));
+      setTopicsNext(response.data.next);
       setError(null);
     } catch (err) {
       console.error('Ошибка загрузки тем:', err);
@@ -355,6 +358,16 @@ const ForumPage = () => {
                   </Link>
                 ))
               )}
+              {topicsNext && (
+                <div className="text-center">
+                  <button
+                    onClick={() => fetchTopics(selectedCategory?.id, topicsNext)}
+                    className="text-primary hover:underline"
+                  >
+                    Показать еще
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
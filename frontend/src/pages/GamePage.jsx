@@ -8,11 +8,51 @@ const GamePage = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [activeTab, setActiveTab] = useState('description');
+  const [reviews, setReviews] = useState(null);
+  const [reviewSort, setReviewSort] = useState('newest');
+  const [similar, setSimilar] = useState([]);
 
   useEffect(() => {
     fetchGame();
+    fetchSimilar();
   }, [id]);
 
+  // «С этой игрой покупают» — готовая таблица, считается офлайн
+  const fetchSimilar = async () => {
+    try {
+      const response = await fetch(`${API_URL}/games/${id}/similar/`);
+      if (response.ok) {
+        const data = await response.json();
+        setSimilar(data.results);
+      }
+    } catch (err) {
+      console.error('Ошибка загрузки похожих игр:', err);
+    }
+  };
+
+  useEffect(() => {
+    if (activeTab === 'reviews') {
+      fetchReviews();
+    }
+  }, [activeTab, reviewSort, id]);
+
+  // Сводка по оценкам приходит вместе с первой страницей; next — курсор следующей
+  const fetchReviews = async (next = null) => {
+    try {
+      const url = next || `${API_URL}/games/${id}/reviews/?sort=${reviewSort}`;
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error('Не удалось загрузить отзывы');
+      }
+      const data = await response.json();
+      setReviews((prev) => (next && prev
+        ? { ...data, results: [...prev.results, ...data.results] }
+        : data));
+    } catch (err) {
+      console.error('Ошибка загрузки отзывов:', err);
+    }
+  };
+
   const fetchGame = async () => {
     try {
       setLoading(true);
@@ -166,7 +206,68 @@ const GamePage = () => {
 
                 {activeTab === 'reviews' && (
                   <div>
-                    <p className="text-gray-500">Отзывы скоро появятся</p>
+                    {!reviews ? (
+                      <p className="text-gray-500">Загрузка отзывов...</p>
+                    ) : reviews.summary.total === 0 ? (
+                      <p className="text-gray-500">Отзывов пока нет</p>
+                    ) : (
+                      <>
+                        <div className="flex items-start gap-8 mb-6">
+                          <div className="text-center">
+                            <div className="text-4xl font-bold text-gray-900">
+                              {reviews.summary.average_rating.toFixed(1)}
+                            </div>
+                            <div className="text-sm text-gray-500">{reviews.summary.total} отзывов</div>
+                          </div>
+                          <div className="flex-1 space-y-1">
+                            {['5', '4', '3', '2', '1'].map((star) => (
+                              <div key={star} className="flex items-center text-sm">
+                                <span className="w-6 text-gray-600">{star}★</span>
+                                <div className="flex-1 h-2 bg-gray-100 rounded mx-2">
+                                  <div
+                                    className="h-2 bg-yellow-400 rounded"
+                                    style={{ width: `${(reviews.summary.histogram[star] / reviews.summary.total) * 100}%` }}
+                                  />
+                                </div>
+                                <span className="w-8 text-right text-gray-500">{reviews.summary.histogram[star]}</span>
+                              </div>
+                            ))}
+                          </div>
+                        </div>
+
+                        <div className="flex justify-end mb-4">
+                          <select
+                            value={reviewSort}
+                            onChange={(e) => setReviewSort(e.target.value)}
+                            className="text-sm border border-gray-300 rounded px-2 py-1"
+                          >
+                            <option value="newest">Сначала новые</option>
+                            <option value="rating">По оценке</option>
+                          </select>
+                        </div>
+
+                        <div className="space-y-4">
+                          {reviews.results.map((review) => (
+                            <div key={review.id} className="border-b border-gray-100 pb-4">
+                              <div className="flex justify-between text-sm mb-1">
+                                <span className="font-medium text-gray-900">{review.user.username}</span>
+                                <span className="text-yellow-500">{'★'.repeat(review.rating)}</span>
+                              </div>
+                              <p className="text-gray-700">{review.text}</p>
+                            </div>
+                          ))}
+                        </div>
+
+                        {reviews.next && (
+                          <button
+                            onClick={() => fetchReviews(reviews.next)}
+                            className="mt-4 text-primary hover:underline"
+                          >
+                            Показать еще
+                          </button>
+                        )}
+                      </>
+                    )}
                   </div>
                 )}
               </div>
@@ -190,6 +291,32 @@ const GamePage = () => {
               </div>
             </div>
           )}
+
+          {/* Похожие игры */}
+          {similar.length > 0 && (
+            <div className="mt-8">
+              <h2 className="text-xl font-bold text-gray-900 mb-4">С этой игрой покупают</h2>
+              <div className="grid grid-cols-2 md:grid-cols-3 gap-4">
+                {similar.map((item) => (
+                  <Link key={item.id} to={`/game/${item.id}`} className="card overflow-hidden hover:shadow-lg">
+                    {item.cover_image && (
+                      <img
+                        src={item.cover_image}
+                        alt={item.title}
+                        className="w-full h-32 object-cover"
+                      />
+                    )}
+                    <div className="p-3">
+                      <div className="font-medium text-gray-900">{item.title}</div>
+                      <div className="text-sm text-gray-500">
+                        {item.is_free ? 'Бесплатно' : `${item.price} ₽`}
+                      </div>
+                    </div>
+                  </Link>
+                ))}
+              </div>
+            </div>
+          )}
         </div>
 
         {/* Правая колонка - покупка */}
@@ -15,14 +15,30 @@ const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
 const HomePage = () => {
   const [games, setGames] = useState([]);
+  const [gamesNext, setGamesNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [backendStatus, setBackendStatus] = useState('checking');
+  const [stats, setStats] = useState(null);
 
   useEffect(() => {
     fetchGames();
+    fetchStats();
   }, []);
 
+  // Сводная статистика считается на сервере, не по загруженной странице игр
+  const fetchStats = async () => {
+    try {
+      const response = await fetch(`${API_URL}/stats/`, { signal: AbortSignal.timeout(10000) });
+      if (response.ok) {
+        setStats(await response.json());
+      }
+    } catch (err) {
+      console.error('Ошибка загрузки статистики:', err);
+    }
+  };
+
   const fetchGames = async () => {
     try {
       setLoading(true);
@@ -46,12 +62,17 @@ const HomePage = () => {
       const data = await response.json();
       console.log('Games loaded:', data);
       
-      // Проверяем, что данные - это массив
-      if (Array.isArray(data)) {
+      // Каталог приходит постранично: { count, next, results }
+      if (Array.isArray(data?.results)) {
+        setGames(data.results);
+        setGamesNext(data.next);
+      } else if (Array.isArray(data)) {
         setGames(data);
+        setGamesNext(null);
       } else {
         console.error('Data is not an array:', data);
         setGames([]);
+        setGamesNext(null);
       }
       
       setError(null);
@@ -79,6 +100,24 @@ const HomePage = () => {
     }
   };
 
+  // Следующая страница каталога по курсору next
+  const fetchMoreGames = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await fetch(gamesNext, { signal: AbortSignal.timeout(10000) });
+      if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+      }
+      const data = await response.json();
+      setGames((prev) => [...prev, ...data.results]);
+      setGamesNext(data.next);
+    } catch (err) {
+      console.error('Ошибка загрузки игр:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getImageUrl = (path) => {
     if (!path) return null;
     if (path.startsWith('http')) return path;
@@ -96,10 +135,9 @@ const HomePage = () => {
   };
 
   // Вычисляем статистику
-  const totalDownloads = games.reduce((sum, game) => sum + (game.downloads || 0), 0);
-  const averageRating = games.length > 0 
-    ? (games.reduce((sum, game) => sum + (game.average_rating || 0), 0) / games.length).toFixed(1)
-    : '0.0';
+  const totalGames = stats?.published_games ?? games.length;
+  const totalDownloads = stats?.total_downloads ?? 0;
+  const averageRating = (stats?.average_rating ?? 0).toFixed(1);
 
   if (loading) {
     return (
@@ -169,7 +207,7 @@ const HomePage = () => {
       <div className="container" style={{ padding: '3rem 1rem' }}>
         <div className="grid grid-cols-2 md:grid-cols-4 gap-6">
           <div className="card p-6 text-center">
-            <div style={{ fontSize: '1.875rem', fontWeight: '700', color: 'var(--primary)', marginBottom: '0.5rem' }}>{games.length}</div>
+            <div style={{ fontSize: '1.875rem', fontWeight: '700', color: 'var(--primary)', marginBottom: '0.5rem' }}>{totalGames}</div>
             <div style={{ color: 'var(--text-secondary)' }}>Игр на платформе</div>
           </div>
           <div className="card p-6 text-center">
@@ -214,13 +252,14 @@ const HomePage = () => {
             <h3 style={{ fontSize: '1.25rem', fontWeight: '600', color: 'var(--text-primary)', marginBottom: '0.5rem' }}>Ошибка подключения</h3>
             <p style={{ color: 'var(--text-secondary)', marginBottom: '1.5rem' }}>{error}</p>
             <button
-              onClick={fetchGames}
+              onClick={() => fetchGames()}
               className="btn btn-primary"
             >
               Попробовать снова
             </button>
           </div>
         ) : games.length > 0 ? (
+          <>
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
             {games.map((game) => (
               <div key={game.id} className="card">
@@ -302,6 +341,18 @@ const HomePage = () => {
               </div>
             ))}
           </div>
+          {gamesNext && (
+            <div style={{ textAlign: 'center', marginTop: '2rem' }}>
+              <button
+                onClick={fetchMoreGames}
+                disabled={loadingMore}
+                className="btn btn-secondary"
+              >
+                {loadingMore ? 'Загрузка...' : 'Показать еще'}
+              </button>
+            </div>
+          )}
+          </>
         ) : (
           <div className="card" style={{ maxWidth: '48rem', margin: '0 auto', padding: '3rem', textAlign: 'center' }}>
             <div style={{ fontSize: '4rem', marginBottom: '1.5rem' }}>🎮</div>
@@ -323,7 +374,7 @@ const HomePage = () => {
               </a>
               {backendStatus === 'offline' && (
                 <button
-                  onClick={fetchGames}
+                  onClick={() => fetchGames()}
                   className="btn btn-secondary"
                 >
                   Попробовать снова
@@ -9,6 +9,8 @@ const TopicPage = () => {
   const { id } = useParams();
   const [topic, setTopic] = useState(null);
   const [posts, setPosts] = useState([]);
+  // Курсоры ленты: next — следующая страница, last — последнее загруженное сообщение
+  const [postsPage, setPostsPage] = useState({ count: 0, next: null, last: null });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [newPost, setNewPost] = useState('');
@@ -21,6 +23,22 @@ const TopicPage = () => {
     fetchPosts();
   }, [id]);
 
+  // Живые обновления по SSE, когда загружены все страницы: новые сообщения
+  // дописываются в конец, после обрыва EventSource сам переподключается
+  // с Last-Event-ID и получает пропущенное
+  const allPostsLoaded = !loading && !postsPage.next;
+  useEffect(() => {
+    if (!allPostsLoaded) return undefined;
+    const after = postsPage.last ? `?after=${encodeURIComponent(postsPage.last)}` : '';
+    const source = new EventSource(`${API_URL}/forum/topics/${id}/events/${after}`);
+    source.addEventListener('post', (event) => {
+      const post = JSON.parse(event.data);
+      setPosts((prev) => (prev.some((item) => item.id === post.id) ? prev : [...prev, post]));
+      setPostsPage((page) => ({ ...page, last: event.lastEventId }));
+    });
+    return () => source.close();
+  }, [id, allPostsLoaded]);
+
   const fetchTopic = async () => {
     try {
       const response = await apiClient.get(`/forum/topics/${id}/`);
@@ -44,10 +62,12 @@ const TopicPage = () => {
     }
   };
 
-  const fetchPosts = async () => {
+  const fetchPosts = async (next = null) => {
     try {
-      const response = await apiClient.get(`/forum/topics/${id}/posts/`);
-      setPosts(response.data);
+      const response = await apiClient.get(next || `/forum/topics/${id}/posts/`);
+      const { count, results, last } = response.data;
+      setPosts((prev) => (next ? [...prev, ...results] : results));
+      setPostsPage({ count, next: response.data.next, last });
     } catch (err) {
       console.error('Ошибка загрузки сообщений:', err);
       // Не показываем ошибку пользователю для постов, только в консоль
@@ -56,6 +76,26 @@ const TopicPage = () => {
     }
   };
 
+  // Только сообщения после последнего загруженного: свой ответ и чужие новые
+  const fetchNewPosts = async () => {
+    if (postsPage.next) return;
+    if (!postsPage.last) return fetchPosts();
+    try {
+      const response = await apiClient.get(`/forum/topics/${id}/posts/`, {
+        params: { after: postsPage.last }
+      });
+      const { count, results, next, last } = response.data;
+      // Часть сообщений могла уже прийти по SSE
+      setPosts((prev) => [
+        ...prev,
+        ...results.filter((post) => !prev.some((item) => item.id === post.id))
+      ]);
+      setPostsPage({ count, next, last });
+    } catch (err) {
+      console.error('Ошибка загрузки новых сообщений:', err);
+    }
+  };
+
   const handleAddPost = async (e) => {
     e.preventDefault();
     
@@ -87,8 +127,8 @@ const TopicPage = () => {
       
       console.log('✅ Ответ:', response.data);
       
-      // Добавляем новое сообщение в список
-      setPosts([...posts, response.data]);
+      // Дозагружаем новые сообщения вместе со своим
+      await fetchNewPosts();
       setNewPost('');
       
     } catch (err) {
@@ -253,6 +293,11 @@ const TopicPage = () => {
                 {topic.views > 0 && (
                   <span className="ml-4">👁 {topic.views} просмотров</span>
                 )}
+                {topic.unique_viewers > 0 && (
+                  <span className="ml-4" title="Оценка числа разных зрителей">
+                    ≈{topic.unique_viewers} зрителей
+                  </span>
+                )}
               </div>
             </div>
           </div>
@@ -274,7 +319,7 @@ const TopicPage = () => {
       {/* Сообщения */}
       <div className="space-y-4 mb-6">
         <h2 className="text-xl font-semibold mb-4">
-          Ответы ({posts.length})
+          Ответы ({postsPage.next ? postsPage.count : posts.length})
         </h2>
 
         {posts.length > 0 ? (
@@ -338,6 +383,15 @@ const TopicPage = () => {
             </p>
           </div>
         )}
+
+        {postsPage.next && (
+          <button
+            onClick={() => fetchPosts(postsPage.next)}
+            className="mt-4 text-primary hover:underline"
+          >
+            Показать еще
+          </button>
+        )}
       </div>
 
       {/* Форма ответа */}